@@ -0,0 +1,18 @@
+import time
+from src.appConfig import getAppConfigDict
+from src.scheduler.warmScheduler import WarmScheduler
+
+
+configDict=getAppConfigDict()
+# config, db pool, scada session and models are created once and kept warm across runs
+obj_warmScheduler = WarmScheduler(configDict)
+obj_warmScheduler.start()
+
+# backfill example -> curl -X POST http://127.0.0.1:8085/backfill -d "{\"job\": \"ingest\", \"start_date\": \"2022-01-01\", \"end_date\": \"2022-01-07\", \"chain_forecast\": true}"
+try:
+    while True:
+        time.sleep(1)
+except KeyboardInterrupt:
+    print('stopping scheduler...')
+    obj_warmScheduler.stop()
+    print(obj_warmScheduler.storageBackend.getTimingSummaryDf().to_string(index=False))
@@ -0,0 +1,64 @@
+import argparse
+from datetime import datetime as dt
+from datetime import timedelta
+from src.appConfig import getAppConfigDict
+from src.storage.storageBackendFactory import getStorageBackend
+from src.dayAheadForecastCreator.dayAheadForecastCreator import lagStartDict
+from src.dfm2Backtest.backtestEngine import runDfm2Backtest
+
+
+configDict=getAppConfigDict()
+# storage backend selected by storage_backend config key (oracle/sqlite)
+storageBackend = getStorageBackend(configDict)
+
+endDate = dt.now()
+startDate = endDate - timedelta(days=30)
+
+
+# get start and end forecast dates from command line
+parser = argparse.ArgumentParser()
+parser.add_argument('--start_date', help="Enter first forecast date in yyyy-mm-dd format",
+                    default=dt.strftime(startDate, '%Y-%m-%d'))
+parser.add_argument('--end_date', help="Enter last forecast date in yyyy-mm-dd format",
+                    default=dt.strftime(endDate, '%Y-%m-%d'))
+parser.add_argument('--revisions', help="Comma separated stored revisions to evaluate like R0A, all if not given",
+                    default='')
+parser.add_argument('--rerun', help="Re-run DFM-2 from stored actuals with current lagStart of each entity instead of evaluating stored forecasts",
+                    action='store_true')
+parser.add_argument('--lag_starts', help="Comma separated candidate lagStart values (applied to all entities) to re-fit, re-run and compare",
+                    default='')
+parser.add_argument('--train_days', help="Days before start date used to re-fit a model per entity for --lag_starts candidates, "
+                    "0 to use stored models of --model_path (only valid for the lagStart they were trained with)", type=int, default=365)
+parser.add_argument('--model_path', help="Model folder used for re-run, model_path of config if not given",
+                    default=configDict['model_path'])
+parser.add_argument('--workers', help="Number of candidates re-run in parallel", type=int, default=4)
+parser.add_argument('--out', help="csv file path for accuracy metrics", default='dfm2_backtest_metrics.csv')
+
+                    
+args = parser.parse_args()
+startDate = dt.strptime(args.start_date, '%Y-%m-%d')
+endDate = dt.strptime(args.end_date, '%Y-%m-%d')
+
+startDate = startDate.replace(hour=0, minute=0, second=0, microsecond=0)
+endDate = endDate.replace(hour=0, minute=0, second=0, microsecond=0)
+
+print('startDate = {0}, endDate = {1}'.format(dt.strftime(
+    startDate, '%Y-%m-%d'), dt.strftime(endDate, '%Y-%m-%d')))
+
+# candidate settings to re-run, stored forecasts are evaluated if there is no candidate
+candidates = []
+if args.rerun:
+    candidates.append({'name': 'current', 'modelPath': args.model_path, 'lagStartDict': lagStartDict})
+for lagStart in [x.strip() for x in args.lag_starts.split(',') if x.strip() != '']:
+    # stored models are trained for a fixed number of lag variables, so lagStart candidates are re-fitted on the same training window
+    candidates.append({'name': 'lagStart{0}'.format(lagStart), 'modelPath': args.model_path,
+                       'lagStartDict': {entity: int(lagStart) for entity in lagStartDict}, 'trainDays': args.train_days})
+listOfRevision = [x.strip() for x in args.revisions.split(',') if x.strip() != '']
+
+backtestStartTime = dt.now()
+metricsDf = runDfm2Backtest(startDate, endDate, configDict, candidates, listOfRevision, args.workers, storageBackend)
+print('DFM-2 backtest completed in {0:.1f}s'.format((dt.now() - backtestStartTime).total_seconds()))
+print(metricsDf[metricsDf['month'] == 'ALL'].to_string(index=False))
+metricsDf.to_csv(args.out, index=False)
+print('accuracy metrics saved to {0}'.format(args.out))
+print(storageBackend.getTimingSummaryDf().to_string(index=False))
@@ -2,10 +2,13 @@ import argparse
 from datetime import datetime as dt
 from datetime import timedelta
 from src.appConfig import getAppConfigDict
+from src.storage.storageBackendFactory import getStorageBackend
 from src.dayAheadForecastCreator.dayAheadForecastCreator import createDayAheadForecast
 
 
 configDict=getAppConfigDict()
+# storage backend selected by storage_backend config key (oracle/sqlite)
+storageBackend = getStorageBackend(configDict)
 
 endDate = dt.now()
 # startDate = endDate - timedelta(days=2)
@@ -31,8 +34,9 @@ print('startDate = {0}, endDate = {1}'.format(dt.strftime(
     startDate, '%Y-%m-%d'), dt.strftime(endDate, '%Y-%m-%d')))
 
 # push raw scada data to db after passing through filtering pipeline
-isRawDataCreationSuccess = createDayAheadForecast(startDate,endDate,configDict)
+isRawDataCreationSuccess = createDayAheadForecast(startDate,endDate,configDict,storageBackend)
 if isRawDataCreationSuccess:
     print('DFM-2 DA forecast creation success...')
 else:
-    print('DFM-2 DA forecast creation failure...')
\ No newline at end of file
+    print('DFM-2 DA forecast creation failure...')
+print(storageBackend.getTimingSummaryDf().to_string(index=False))
\ No newline at end of file
@@ -2,10 +2,13 @@ import argparse
 from datetime import datetime as dt
 from datetime import timedelta
 from src.appConfig import getAppConfigDict
+from src.storage.storageBackendFactory import getStorageBackend
 from src.filteredScadaDemandTodb.insFilteredScadaDemand import insFilteredScadaDemand
 
 
 configDict=getAppConfigDict()
+# storage backend selected by storage_backend config key (oracle/sqlite)
+storageBackend = getStorageBackend(configDict)
 
 endDate = dt.now()- timedelta(days=1)
 # startDate = endDate - timedelta(days=2)
@@ -31,8 +34,9 @@ print('startDate = {0}, endDate = {1}'.format(dt.strftime(
     startDate, '%Y-%m-%d'), dt.strftime(endDate, '%Y-%m-%d')))
 
 # push raw scada data to db after passing through filtering pipeline
-isRawDataCreationSuccess = insFilteredScadaDemand(startDate,endDate,configDict)
+isRawDataCreationSuccess = insFilteredScadaDemand(startDate,endDate,configDict,storageBackend)
 if isRawDataCreationSuccess:
     print('interpolated blockwise demand creation success...')
 else:
-    print('interpolated blockwise demand creation failure...')
\ No newline at end of file
+    print('interpolated blockwise demand creation failure...')
+print(storageBackend.getTimingSummaryDf().to_string(index=False))
\ No newline at end of file
@@ -0,0 +1,24 @@
+import time
+from src.appConfig import getAppConfigDict
+from src.fetchers.scadaApiFetcher import ScadaApiFetcher
+from src.storage.storageBackendFactory import getStorageBackend
+from src.filteredScadaDemandTodb.intradayDemandIngest import IntradayDemandIngest
+
+
+configDict=getAppConfigDict()
+# storage backend selected by storage_backend config key (oracle/sqlite)
+storageBackend = getStorageBackend(configDict)
+obj_scadaApiFetcher = ScadaApiFetcher(configDict['tokenUrl'], configDict['apiBaseUrl'], configDict['clientId'], configDict['clientSecret'])
+# seconds between two polls of today's scada data
+pollSecs = float(configDict.get('intraday_poll_secs', 60))
+
+# poll today's raw demand and write filtered blocks as soon as they are final
+obj_intradayDemandIngest = IntradayDemandIngest(storageBackend, obj_scadaApiFetcher)
+try:
+    while True:
+        pollStartTime = time.perf_counter()
+        numOfBlocks, isSuccess = obj_intradayDemandIngest.poll()
+        print('intraday poll: {0} blocks written, {1}'.format(numOfBlocks, 'success' if isSuccess else 'failure'))
+        time.sleep(max(pollSecs - (time.perf_counter() - pollStartTime), 0))
+except KeyboardInterrupt:
+    print(storageBackend.getTimingSummaryDf().to_string(index=False))
@@ -0,0 +1,55 @@
+import argparse
+from datetime import datetime as dt
+from datetime import timedelta
+from src.appConfig import getAppConfigDict
+from src.filteredScadaDemandTodb.demandDataFetcher import fetchRawDemandData, listOfEntity
+from src.filteredScadaDemandTodb.streamingSpikeFilter import compareWithBatchFilter, makeSyntheticRawDay
+
+
+endDate = dt.now()- timedelta(days=1)
+startDate = endDate
+
+
+# get start and end dates from command line
+parser = argparse.ArgumentParser()
+parser.add_argument('--start_date', help="Enter Start date in yyyy-mm-dd format",
+                    default=dt.strftime(startDate, '%Y-%m-%d'))
+parser.add_argument('--end_date', help="Enter end date in yyyy-mm-dd format",
+                    default=dt.strftime(endDate, '%Y-%m-%d'))
+parser.add_argument('--batch_size', help="Number of raw samples pushed to streaming filter at a time", type=int, default=60)
+parser.add_argument('--synthetic', help="Replay generated days (noise, spikes, out of bound, nan samples and gaps) instead of api data, no api credentials needed",
+                    action='store_true')
+
+                    
+args = parser.parse_args()
+startDate = dt.strptime(args.start_date, '%Y-%m-%d')
+endDate = dt.strptime(args.end_date, '%Y-%m-%d')
+
+startDate = startDate.replace(hour=0, minute=0, second=0, microsecond=0)
+endDate = endDate.replace(hour=0, minute=0, second=0, microsecond=0)
+
+print('startDate = {0}, endDate = {1}'.format(dt.strftime(
+    startDate, '%Y-%m-%d'), dt.strftime(endDate, '%Y-%m-%d')))
+
+if not args.synthetic:
+    configDict=getAppConfigDict()
+
+# replay each full day through streaming filter and check against batch filter
+isAllSame = True
+currDate = startDate
+while currDate <= endDate:
+    if args.synthetic:
+        rawDemandDict = {entity: makeSyntheticRawDay(currDate, entity, seed=currDate.toordinal()*len(listOfEntity) + entityInd) for entityInd, entity in enumerate(listOfEntity)}
+    else:
+        rawDemandDict = fetchRawDemandData(currDate, configDict)
+    for entity, rawDemandDf in rawDemandDict.items():
+        result = compareWithBatchFilter(rawDemandDf, entity, args.batch_size)
+        print('{0} {1}: blocks = {2}/{3}, same blocks = {4}, max abs diff = {5}, late samples = {6}'.format(dt.strftime(currDate, '%Y-%m-%d'), entity,
+              result['numOfStreamedBlocks'], result['numOfBlocks'], result['isSameBlocks'], result['maxAbsDiff'], result['numOfLateSamples']))
+        isAllSame = isAllSame and result['isSameBlocks'] and not (result['maxAbsDiff'] > 1e-6)
+    currDate += timedelta(days=1)
+
+if isAllSame:
+    print('streaming filter matches batch filter...')
+else:
+    print('streaming filter mismatch with batch filter...')
@@ -0,0 +1,2 @@
+call project_env\Scripts\activate.bat
+call python index_daemon.py
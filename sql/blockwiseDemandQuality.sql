@@ -0,0 +1,13 @@
+create table blockwise_demand_quality
+(
+id NUMBER GENERATED BY DEFAULT ON NULL AS IDENTITY,
+time_stamp date,
+entity_tag varchar2(100),
+sample_count number,
+gap_minutes number,
+hard_bound_rejections number,
+hard_bound_minutes number,
+spike_replacements number,
+constraints unique_demand_quality unique(time_stamp,entity_tag),
+constraints pk_demand_quality primary key(id)
+)
\ No newline at end of file
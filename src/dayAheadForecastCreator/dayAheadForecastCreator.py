@@ -1,24 +1,36 @@
 import datetime as dt
-from typing import List, Tuple, Union
+from typing import List, Optional, Tuple, Union
 import pandas as pd
 from src.dayAheadForecastCreator.blockwiseDemandFetch import DemandFetchForModelRepo
 from src.dayAheadForecastCreator.mlrPredictions import MlrPredictions
 from src.dayAheadForecastCreator.daForecastInsertion import DayAheadDemandForecastInsertion
+from src.storage.storageBackend import StorageBackend
+from src.storage.storageBackendFactory import getStorageBackend
 
+#lagStart (Hyper-parameter) of each entity, number of leading lag variables dropped from [D-28, D-21, D-14, D-7, D-6, D-5, D-4, D-3, D-2]
+lagStartDict = {'WRLDCMP.SCADA1.A0047000': 0,
+                'WRLDCMP.SCADA1.A0046978': 1,
+                'WRLDCMP.SCADA1.A0046980': 0,
+                'WRLDCMP.SCADA1.A0046957': 0,
+                'WRLDCMP.SCADA1.A0046945': 0}
 
 
-def createDayAheadForecast(startDate:dt.datetime ,endDate: dt.datetime, configDict:dict)->bool:
+def createDayAheadForecast(startDate:dt.datetime ,endDate: dt.datetime, configDict:dict, storageBackend:Optional[StorageBackend]=None,
+                           obj_mlrPredictions:Optional[MlrPredictions]=None)->bool:
     """ create DA forecast using DFM-2
     Args:
         startDate (dt.datetime): start date
         endDate (dt.datetime): end date
         configDict (dict):   apllication configuration dictionary
+        storageBackend (Optional[StorageBackend]): storage backend, created from configDict if not given
+        obj_mlrPredictions (Optional[MlrPredictions]): predictor to reuse (warm models), created from configDict if not given
     Returns:
         bool: return true if insertion is success.
     """    
 
     
-    conString:str = configDict['con_string_mis_warehouse']
+    if storageBackend is None:
+        storageBackend = getStorageBackend(configDict)
     modelPath:str = configDict['model_path']
     # listOfEntity =['WRLDCMP.SCADA1.A0046945','WRLDCMP.SCADA1.A0046948','WRLDCMP.SCADA1.A0046953','WRLDCMP.SCADA1.A0046957','WRLDCMP.SCADA1.A0046962','WRLDCMP.SCADA1.A0046978','WRLDCMP.SCADA1.A0046980','WRLDCMP.SCADA1.A0047000']
     listOfEntity =['WRLDCMP.SCADA1.A0047000', 'WRLDCMP.SCADA1.A0046978','WRLDCMP.SCADA1.A0046980', 'WRLDCMP.SCADA1.A0046957', 'WRLDCMP.SCADA1.A0046945']
@@ -26,9 +38,10 @@ def createDayAheadForecast(startDate:dt.datetime ,endDate: dt.datetime, configDi
 
     
     #creating instance of class
-    obj_demandFetchForModelRepo = DemandFetchForModelRepo(conString)
-    obj_mlrPredictions = MlrPredictions(modelPath)
-    obj_daDemandForecastInsertion = DayAheadDemandForecastInsertion(conString)
+    obj_demandFetchForModelRepo = DemandFetchForModelRepo(storageBackend)
+    if obj_mlrPredictions is None:
+        obj_mlrPredictions = MlrPredictions(modelPath)
+    obj_daDemandForecastInsertion = DayAheadDemandForecastInsertion(storageBackend)
     
     insertSuccessCount=0
     currDate = startDate
@@ -38,16 +51,7 @@ def createDayAheadForecast(startDate:dt.datetime ,endDate: dt.datetime, configDi
         #intializing empty dataframe to store forecast of all entities
         storeForecastDf = pd.DataFrame(columns = [ 'timestamp','entityTag','forecastedDemand']) 
         for entity in listOfEntity:
-            if entity =='WRLDCMP.SCADA1.A0047000':
-                lagDemandDf = obj_demandFetchForModelRepo.fetchBlockwiseDemandForModel(currDate, entity, lagStart=0)
-            elif entity == 'WRLDCMP.SCADA1.A0046978':
-                lagDemandDf = obj_demandFetchForModelRepo.fetchBlockwiseDemandForModel(currDate, entity, lagStart=1)
-            elif entity == 'WRLDCMP.SCADA1.A0046980':
-                lagDemandDf = obj_demandFetchForModelRepo.fetchBlockwiseDemandForModel(currDate, entity, lagStart=0)
-            elif entity == 'WRLDCMP.SCADA1.A0046957':
-                lagDemandDf = obj_demandFetchForModelRepo.fetchBlockwiseDemandForModel(currDate, entity, lagStart=0)
-            elif entity == 'WRLDCMP.SCADA1.A0046945':
-                lagDemandDf = obj_demandFetchForModelRepo.fetchBlockwiseDemandForModel(currDate, entity, lagStart=0)
+            lagDemandDf = obj_demandFetchForModelRepo.fetchBlockwiseDemandForModel(currDate, entity, lagStart=lagStartDict[entity])
             predictedDaDf = obj_mlrPredictions.predictDaMlr(lagDemandDf, entity)
             # print(predictedDaDf)
             storeForecastDf = pd.concat([storeForecastDf, predictedDaDf],ignore_index=True)
@@ -14,6 +14,9 @@ class MlrPredictions():
         """
         self.modelPath = modelPath
         self.modelPathStr =""
+        # loaded models (model file path -> model) and calendar dummies are kept so that a long running process predicts warm
+        self.modelCache = {}
+        self.calendarDummies = None
 
     def dummyVariableGenerator(self, ts):
         #Making dummy variables
@@ -28,9 +31,49 @@ class MlrPredictions():
         daytimeblockDummies = pd.get_dummies(daytimeblock.sort_values()).sort_index()
         return monthDummies, daytimeblockDummies
         
+    def getCalendarDummies(self):
+        """month and daytimeblock dummies of model calendar, generated once
+        Returns:
+            tuple: (monthDummies, daytimeblockDummies)
+        """
+        if self.calendarDummies is None:
+            ts = pd.date_range(start = pd.Timestamp("2022-01-01 00:00:00"), end = pd.Timestamp("2022-12-31 23:59:59"),
+                                   freq ='15min').rename("time").to_frame()
+            self.calendarDummies = self.dummyVariableGenerator(ts)
+        return self.calendarDummies
+
+    def getModelPathStr(self, entity:str) -> str:
+        """returns path of model file of entity
+        Args:
+            entity (str): entity tag like 'WRLDCMP.SCADA1.A0047000'
+        Returns:
+            str: model file path
+        """
+        return self.modelPath + '\\' + str(entity) +'.pkl'
+
+    def loadModel(self, entity:str):
+        """load trained model of entity
+        Args:
+            entity (str): entity tag like 'WRLDCMP.SCADA1.A0047000'
+        Returns:
+            trained regression model
+        """
+        return self.loadModelFromPath(self.getModelPathStr(entity))
+
+    def loadModelFromPath(self, modelPathStr:str):
+        """load model file once and return cached model afterwards
+        Args:
+            modelPathStr (str): model file path
+        Returns:
+            trained regression model
+        """
+        if modelPathStr not in self.modelCache:
+            self.modelCache[modelPathStr] = joblib.load(modelPathStr)
+        return self.modelCache[modelPathStr]
+
     def modelPredictions(self, lagDemandDf, monthDummies, daytimeblockDummies):
              
-        prediction_obj = joblib.load(self.modelPathStr)
+        prediction_obj = self.loadModelFromPath(self.modelPathStr)
         X_input = pd.concat([monthDummies.iloc[:,:-1],  #Exclude the last category
                             daytimeblockDummies.iloc[:,:-1],  #Exclude the last category
                             lagDemandDf   
@@ -53,11 +96,9 @@ class MlrPredictions():
         """    
 
         #setting model path string(class variable) based on entity tag(means deciding which model ti use)
-        self.modelPathStr = self.modelPath + '\\' + str(entity) +'.pkl'
+        self.modelPathStr = self.getModelPathStr(entity)
 
-        ts = pd.date_range(start = pd.Timestamp("2022-01-01 00:00:00"), end = pd.Timestamp("2022-12-31 23:59:59"),
-                               freq ='15min').rename("time").to_frame()
-        monthDummies, dayhourDummies = self.dummyVariableGenerator(ts)
+        monthDummies, dayhourDummies = self.getCalendarDummies()
 
         daPredictionSeries= self.modelPredictions(lagDemandDf, monthDummies,dayhourDummies)
         daPredictionDf = daPredictionSeries.to_frame()
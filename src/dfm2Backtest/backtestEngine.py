@@ -0,0 +1,328 @@
+import datetime as dt
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+import numpy as np
+import pandas as pd
+from scipy import sparse
+from sklearn.linear_model import LinearRegression
+from src.dayAheadForecastCreator.mlrPredictions import MlrPredictions
+from src.dayAheadForecastCreator.dayAheadForecastCreator import lagStartDict
+from src.storage.storageBackend import StorageBackend
+from src.storage.storageBackendFactory import getStorageBackend
+
+#lag (in days) of each lag variable w.r.t. forecast day, same column order as DemandFetchForModelRepo.fetchBlockwiseDemandForModel
+lagDays = [28, 21, 14, 7, 6, 5, 4, 3, 2]
+maxLagDays = max(lagDays)
+blocksPerDay = 96
+#month dummy columns are in sorted label order m1, m10, m11, m12, m2 ... m9, last one (m9) is excluded from model input
+sortedMonthLabels = sorted(['m{0}'.format(month) for month in range(1, 13)])
+monthToDummyCol = np.array([sortedMonthLabels.index('m{0}'.format(month)) for month in range(1, 13)])
+numOfMonthDummies = len(sortedMonthLabels) - 1
+#daytimeblock dummy columns are d0_00:00 ... d6_23:45, last one (d6_23:45) is excluded from model input
+numOfDaytimeblockDummies = 7*blocksPerDay - 1
+
+
+def toBlockDayArray(df: pd.core.frame.DataFrame, valueCol: str, listOfEntity: List[str], startDate: dt.datetime, numOfDays: int,
+                    groupCol: Optional[str] = None, listOfGroup: Optional[List[str]] = None) -> np.ndarray:
+    """scatter long blockwise dataframe into entity x day x block array (group x entity x day x block if groupCol given), missing blocks are nan
+
+    Args:
+        df (pd.core.frame.DataFrame): dataframe with timestamp, entityTag and value column
+        valueCol (str): value column name
+        listOfEntity (List[str]): entity tags, order of entity axis
+        startDate (dt.datetime): date of first day of day axis
+        numOfDays (int): length of day axis
+        groupCol (Optional[str]): optional extra grouping column like revisionNo
+        listOfGroup (Optional[List[str]]): order of group axis
+
+    Returns:
+        np.ndarray: array of shape (entity, day, 96) or (group, entity, day, 96)
+    """
+    numOfGroups = 1 if groupCol is None else len(listOfGroup)
+    blockDayArr = np.full((numOfGroups, len(listOfEntity), numOfDays, blocksPerDay), np.nan)
+    if len(df) > 0:
+        timestamps = pd.DatetimeIndex(pd.to_datetime(df['timestamp']))
+        minutesFromStart = ((timestamps - pd.Timestamp(startDate))//pd.Timedelta(minutes=1)).values
+        dayInd = minutesFromStart//(24*60)
+        blockInd = (minutesFromStart % (24*60))//15
+        entityInd = pd.Categorical(df['entityTag'], categories=listOfEntity).codes
+        groupInd = np.zeros(len(df), dtype=np.int64) if groupCol is None else pd.Categorical(df[groupCol], categories=listOfGroup).codes
+        isInRange = (dayInd >= 0) & (dayInd < numOfDays) & (entityInd >= 0) & (groupInd >= 0)
+        blockDayArr[groupInd[isInRange], entityInd[isInRange], dayInd[isInRange], blockInd[isInRange]] = df[valueCol].values[isInRange].astype(np.float64)
+    return blockDayArr[0] if groupCol is None else blockDayArr
+
+
+def toCalendarDummyIndices(dayTimestamps: pd.DatetimeIndex) -> tuple:
+    """month and daytimeblock dummy column index of every block of every day, -1 where the dummy is the excluded category
+
+    Args:
+        dayTimestamps (pd.DatetimeIndex): forecast days
+
+    Returns:
+        tuple: (monthCol, daytimeblockCol) int arrays of shape (day, 96)
+    """
+    monthCol = np.repeat(monthToDummyCol[dayTimestamps.month.values - 1][:, None], blocksPerDay, axis=1)
+    daytimeblockCol = dayTimestamps.dayofweek.values[:, None]*blocksPerDay + np.arange(blocksPerDay)[None, :]
+    monthCol = np.where(monthCol < numOfMonthDummies, monthCol, -1)
+    daytimeblockCol = np.where(daytimeblockCol < numOfDaytimeblockDummies, daytimeblockCol, -1)
+    return monthCol, daytimeblockCol
+
+
+def toLagArray(entityActualArr: np.ndarray, firstDayInd: int, numOfDays: int, lags: List[int]) -> np.ndarray:
+    """lag variables of consecutive days, lag variable k of day t is actual of day t-k, i.e. a shifted slice of the actual array
+
+    Args:
+        entityActualArr (np.ndarray): actual demand of an entity (day, 96)
+        firstDayInd (int): day axis index of first day, must be >= max(lags)
+        numOfDays (int): number of days
+        lags (List[int]): lag (in days) of each lag variable
+
+    Returns:
+        np.ndarray: lag variables of shape (day, 96, numOfLags)
+    """
+    return np.stack([entityActualArr[firstDayInd-lag:firstDayInd-lag+numOfDays, :] for lag in lags], axis=2)
+
+
+def getModelNumOfLags(model) -> Optional[int]:
+    """number of lag variables a trained model expects, None if it can not be known from the model"""
+    if hasattr(model, 'coef_'):
+        numOfFeatures = np.asarray(model.coef_).reshape(-1).size
+    elif hasattr(model, 'n_features_in_'):
+        numOfFeatures = int(model.n_features_in_)
+    else:
+        return None
+    return numOfFeatures - numOfMonthDummies - numOfDaytimeblockDummies
+
+
+def fitBlockDayArray(lagArr: np.ndarray, actualArr: np.ndarray, monthCol: np.ndarray, daytimeblockCol: np.ndarray) -> LinearRegression:
+    """fit linear model with same inputs as trained DFM-2 models (month dummies, daytimeblock dummies, lag variables) on all blocks of all days,
+    blocks with missing actual or lag value are skipped
+
+    Args:
+        lagArr (np.ndarray): lag variables of shape (day, 96, numOfLags)
+        actualArr (np.ndarray): actual demand of shape (day, 96)
+        monthCol (np.ndarray): month dummy column index of shape (day, 96)
+        daytimeblockCol (np.ndarray): daytimeblock dummy column index of shape (day, 96)
+
+    Returns:
+        LinearRegression: fitted model
+    """
+    isValid = ~np.isnan(lagArr).any(axis=2) & ~np.isnan(actualArr)
+    if not isValid.any():
+        raise ValueError('no block with actual and all lag values in training window')
+    lagRows = lagArr[isValid]
+    monthRows = monthCol[isValid]
+    daytimeblockRows = daytimeblockCol[isValid]
+    numOfRows = len(lagRows)
+    rowInd = np.arange(numOfRows)
+    # one hot dummies as sparse matrix, excluded category (-1) has no column
+    monthDummies = sparse.csr_matrix((np.ones(int((monthRows >= 0).sum())), (rowInd[monthRows >= 0], monthRows[monthRows >= 0])),
+                                     shape=(numOfRows, numOfMonthDummies))
+    daytimeblockDummies = sparse.csr_matrix((np.ones(int((daytimeblockRows >= 0).sum())), (rowInd[daytimeblockRows >= 0], daytimeblockRows[daytimeblockRows >= 0])),
+                                            shape=(numOfRows, numOfDaytimeblockDummies))
+    xInput = sparse.hstack([monthDummies, daytimeblockDummies, sparse.csr_matrix(lagRows)], format='csr')
+    return LinearRegression().fit(xInput, actualArr[isValid])
+
+
+def predictBlockDayArray(model, lagArr: np.ndarray, monthCol: np.ndarray, daytimeblockCol: np.ndarray) -> np.ndarray:
+    """predict all blocks of all days of an entity at once, blocks with any missing lag value are nan
+
+    Args:
+        model: trained model of entity
+        lagArr (np.ndarray): lag variables of shape (day, 96, numOfLags)
+        monthCol (np.ndarray): month dummy column index of shape (day, 96)
+        daytimeblockCol (np.ndarray): daytimeblock dummy column index of shape (day, 96)
+
+    Returns:
+        np.ndarray: forecast of shape (day, 96)
+    """
+    forecastArr = np.full(monthCol.shape, np.nan)
+    isValid = ~np.isnan(lagArr).any(axis=2)
+    if not isValid.any():
+        return forecastArr
+    lagRows = lagArr[isValid]
+    monthRows = monthCol[isValid]
+    daytimeblockRows = daytimeblockCol[isValid]
+    if hasattr(model, 'coef_') and hasattr(model, 'intercept_'):
+        # linear model, dummy terms are a coefficient lookup instead of a sparse dot product
+        coef = np.asarray(model.coef_, dtype=np.float64).reshape(-1)
+        monthCoef = np.append(coef[:numOfMonthDummies], 0.0)
+        daytimeblockCoef = np.append(coef[numOfMonthDummies:numOfMonthDummies+numOfDaytimeblockDummies], 0.0)
+        lagCoef = coef[numOfMonthDummies+numOfDaytimeblockDummies:]
+        predictions = float(np.asarray(model.intercept_).reshape(-1)[0]) + monthCoef[monthRows] + daytimeblockCoef[daytimeblockRows] + lagRows @ lagCoef
+    else:
+        numOfRows = len(lagRows)
+        xInput = np.zeros((numOfRows, numOfMonthDummies + numOfDaytimeblockDummies + lagRows.shape[1]))
+        rowInd = np.arange(numOfRows)
+        xInput[rowInd[monthRows >= 0], monthRows[monthRows >= 0]] = 1
+        xInput[rowInd[daytimeblockRows >= 0], numOfMonthDummies + daytimeblockRows[daytimeblockRows >= 0]] = 1
+        xInput[:, numOfMonthDummies+numOfDaytimeblockDummies:] = lagRows
+        predictions = model.predict(xInput).flatten()
+    forecastArr[isValid] = predictions
+    return forecastArr
+
+
+def validateCandidate(candidate: dict, listOfEntity: List[str]) -> None:
+    """check that stored models of a candidate that is not re-fitted expect the candidate's number of lag variables
+
+    Args:
+        candidate (dict): candidate settings, see rerunCandidate
+        listOfEntity (List[str]): entity tags
+
+    Raises:
+        ValueError: if a model was trained for a different number of lag variables
+    """
+    if candidate.get('trainDays', 0) > 0:
+        return
+    obj_mlrPredictions = MlrPredictions(candidate['modelPath'])
+    for entity in listOfEntity:
+        try:
+            model = obj_mlrPredictions.loadModel(entity)
+        except Exception as err:
+            # missing model is reported per entity while re-running, like createDayAheadForecast
+            print('error while loading model of {0} for {1}'.format(entity, candidate['name']), err)
+            continue
+        numOfLags = len(lagDays[candidate['lagStartDict'][entity]:])
+        modelNumOfLags = getModelNumOfLags(model)
+        if modelNumOfLags is not None and modelNumOfLags != numOfLags:
+            raise ValueError("candidate '{0}': model of {1} in {2} expects {3} lag variables but lagStart {4} gives {5}, "
+                             "re-fit the candidate (trainDays) or give a model path trained for this lagStart".format(
+                                 candidate['name'], entity, candidate['modelPath'], modelNumOfLags, candidate['lagStartDict'][entity], numOfLags))
+
+
+def rerunCandidate(candidate: dict, extendedActualArr: np.ndarray, dayTimestamps: pd.DatetimeIndex, listOfEntity: List[str]) -> np.ndarray:
+    """re-run DFM-2 for all forecast days of all entities with candidate settings.
+    with trainDays, a linear model per entity is re-fitted on the trainDays days just before the first forecast day instead of loading stored models
+
+    Args:
+        candidate (dict): {'name': str, 'modelPath': str, 'lagStartDict': entity -> lagStart, optional 'trainDays': int}
+        extendedActualArr (np.ndarray): actual demand (entity, historyDays + day, 96) starting historyDays (>= trainDays + maxLagDays) before first forecast day
+        dayTimestamps (pd.DatetimeIndex): forecast days
+        listOfEntity (List[str]): entity tags
+
+    Returns:
+        np.ndarray: forecast of shape (entity, day, 96)
+    """
+    numOfDays = len(dayTimestamps)
+    historyDays = extendedActualArr.shape[1] - numOfDays
+    trainDays = int(candidate.get('trainDays', 0))
+    obj_mlrPredictions = MlrPredictions(candidate['modelPath'])
+    monthCol, daytimeblockCol = toCalendarDummyIndices(dayTimestamps)
+    if trainDays > 0:
+        trainMonthCol, trainDaytimeblockCol = toCalendarDummyIndices(pd.date_range(end=dayTimestamps[0] - pd.Timedelta(days=1), periods=trainDays, freq='D'))
+    forecastArr = np.full((len(listOfEntity), numOfDays, blocksPerDay), np.nan)
+    for entityInd, entity in enumerate(listOfEntity):
+        lags = lagDays[candidate['lagStartDict'][entity]:]
+        lagArr = toLagArray(extendedActualArr[entityInd], historyDays, numOfDays, lags)
+        try:
+            if trainDays > 0:
+                trainLagArr = toLagArray(extendedActualArr[entityInd], historyDays - trainDays, trainDays, lags)
+                model = fitBlockDayArray(trainLagArr, extendedActualArr[entityInd, historyDays-trainDays:historyDays, :], trainMonthCol, trainDaytimeblockCol)
+            else:
+                model = obj_mlrPredictions.loadModel(entity)
+            forecastArr[entityInd] = predictBlockDayArray(model, lagArr, monthCol, daytimeblockCol)
+        except Exception as err:
+            print('error while re-running {0} for {1}'.format(candidate['name'], entity), err)
+    return forecastArr
+
+
+def computeAccuracyMetrics(actualArr: np.ndarray, forecastArr: np.ndarray, dayTimestamps: pd.DatetimeIndex, listOfEntity: List[str], listOfRevision: List[str]) -> pd.core.frame.DataFrame:
+    """MAPE, RMSE, bias and peak block error per revision, entity and month (plus 'ALL' months) without looping over days
+
+    Args:
+        actualArr (np.ndarray): actual demand of shape (entity, day, 96)
+        forecastArr (np.ndarray): forecast of shape (revision, entity, day, 96)
+        dayTimestamps (pd.DatetimeIndex): forecast days
+        listOfEntity (List[str]): entity tags
+        listOfRevision (List[str]): revision numbers or candidate names
+
+    Returns:
+        pd.core.frame.DataFrame: dataframe(revisionNo, entityTag, month, mape, rmse, bias, peakBlockErrorPct, numOfBlocks)
+    """
+    errArr = forecastArr - actualArr[None]
+    isValid = ~np.isnan(errArr)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        apeArr = np.where(isValid & (actualArr[None] != 0), np.abs(errArr)/np.abs(actualArr[None])*100, np.nan)
+
+        # block of peak actual demand of each entity and day, forecast error at that block
+        hasActual = ~np.isnan(actualArr).all(axis=2)
+        peakBlockInd = np.argmax(np.where(np.isnan(actualArr), -np.inf, actualArr), axis=2)
+        peakActual = np.take_along_axis(actualArr, peakBlockInd[..., None], axis=2)[..., 0]
+        peakForecast = np.take_along_axis(forecastArr, np.broadcast_to(peakBlockInd[None, ..., None], forecastArr.shape[:3] + (1,)), axis=3)[..., 0]
+        peakErrPct = np.where(hasActual[None] & (peakActual[None] != 0), np.abs(peakForecast - peakActual[None])/np.abs(peakActual[None])*100, np.nan)
+
+    # per day sums of shape (revision, entity, day)
+    daySums = {'apeSum': np.nansum(apeArr, axis=3), 'apeCount': (~np.isnan(apeArr)).sum(axis=3),
+               'sqErrSum': np.nansum(errArr**2, axis=3), 'errSum': np.nansum(errArr, axis=3), 'count': isValid.sum(axis=3),
+               'peakErrSum': np.nan_to_num(peakErrPct), 'peakCount': (~np.isnan(peakErrPct)).astype(np.int64)}
+
+    # day -> month one hot matrix with an extra all ones column for whole range, month sums with a single matmul
+    monthKeys = dayTimestamps.strftime('%Y-%m')
+    listOfMonth = sorted(set(monthKeys))
+    monthOneHot = (np.asarray(monthKeys)[:, None] == np.array(listOfMonth)[None, :]).astype(np.float64)
+    monthOneHot = np.hstack([monthOneHot, np.ones((len(dayTimestamps), 1))])
+    listOfMonth.append('ALL')
+    monthSums = {key: np.einsum('red,dm->rem', daySum.astype(np.float64), monthOneHot) for key, daySum in daySums.items()}
+
+    with np.errstate(invalid='ignore', divide='ignore'):
+        mape = monthSums['apeSum']/monthSums['apeCount']
+        rmse = np.sqrt(monthSums['sqErrSum']/monthSums['count'])
+        bias = monthSums['errSum']/monthSums['count']
+        peakBlockErrorPct = monthSums['peakErrSum']/monthSums['peakCount']
+
+    revisionInd, entityInd, monthInd = np.meshgrid(np.arange(len(listOfRevision)), np.arange(len(listOfEntity)), np.arange(len(listOfMonth)), indexing='ij')
+    metricsDf = pd.DataFrame({'revisionNo': np.array(listOfRevision, dtype=object)[revisionInd.ravel()],
+                              'entityTag': np.array(listOfEntity, dtype=object)[entityInd.ravel()],
+                              'month': np.array(listOfMonth, dtype=object)[monthInd.ravel()],
+                              'mape': mape.ravel(), 'rmse': rmse.ravel(), 'bias': bias.ravel(),
+                              'peakBlockErrorPct': peakBlockErrorPct.ravel(), 'numOfBlocks': monthSums['count'].ravel().astype(np.int64)})
+    return metricsDf
+
+
+def runDfm2Backtest(startDate: dt.datetime, endDate: dt.datetime, configDict: dict, candidates: Optional[List[dict]] = None,
+                    listOfRevision: Optional[List[str]] = None, maxWorkers: int = 4, storageBackend: Optional[StorageBackend] = None) -> pd.core.frame.DataFrame:
+    """backtest DFM-2 forecasts of all entities for forecast days between start and end date.
+    stored forecast revisions are evaluated if no candidates are given, else every candidate is re-run (in parallel) from stored actuals.
+
+    Args:
+        startDate (dt.datetime): first forecast day
+        endDate (dt.datetime): last forecast day
+        configDict (dict): application configuration dictionary
+        candidates (Optional[List[dict]]): candidate settings {'name': str, 'modelPath': str, 'lagStartDict': entity -> lagStart, optional 'trainDays': int}
+        listOfRevision (Optional[List[str]]): stored revisions to evaluate, all stored revisions if None
+        maxWorkers (int): number of candidates re-run in parallel
+        storageBackend (Optional[StorageBackend]): storage backend, created from configDict if not given
+
+    Returns:
+        pd.core.frame.DataFrame: accuracy metrics, see computeAccuracyMetrics
+    """
+    if storageBackend is None:
+        storageBackend = getStorageBackend(configDict)
+    listOfEntity = list(lagStartDict.keys())
+    dayTimestamps = pd.date_range(start=startDate, end=endDate, freq='D')
+    numOfDays = len(dayTimestamps)
+    endTime = endDate + dt.timedelta(hours=23, minutes=45)
+
+    if candidates:
+        # fail before any fetch if a stored model can not take the candidate's lag variables
+        for candidate in candidates:
+            validateCandidate(candidate, listOfEntity)
+        # actuals from training window and maxLagDays before it so that all lag variables and training targets come from the same bulk fetch
+        historyDays = maxLagDays + max(int(candidate.get('trainDays', 0)) for candidate in candidates)
+        extendedStartDate = startDate - dt.timedelta(days=historyDays)
+        actualDf = storageBackend.fetchBlockwiseDemand(extendedStartDate, endTime, listOfEntity)
+        extendedActualArr = toBlockDayArray(actualDf, 'demandValue', listOfEntity, extendedStartDate, numOfDays + historyDays)
+        actualArr = extendedActualArr[:, historyDays:, :]
+        with ThreadPoolExecutor(max_workers=maxWorkers) as executor:
+            listOfForecastArr = list(executor.map(lambda candidate: rerunCandidate(candidate, extendedActualArr, dayTimestamps, listOfEntity), candidates))
+        forecastArr = np.stack(listOfForecastArr, axis=0)
+        listOfRevision = [candidate['name'] for candidate in candidates]
+    else:
+        actualDf = storageBackend.fetchBlockwiseDemand(startDate, endTime, listOfEntity)
+        actualArr = toBlockDayArray(actualDf, 'demandValue', listOfEntity, startDate, numOfDays)
+        forecastDf = storageBackend.fetchForecastRevisions(startDate, endTime, listOfEntity, listOfRevision)
+        if not listOfRevision:
+            listOfRevision = sorted(forecastDf['revisionNo'].unique()) if len(forecastDf) > 0 else []
+        forecastArr = toBlockDayArray(forecastDf, 'forecastedDemand', listOfEntity, startDate, numOfDays, 'revisionNo', listOfRevision)
+
+    return computeAccuracyMetrics(actualArr, forecastArr, dayTimestamps, listOfEntity, listOfRevision)
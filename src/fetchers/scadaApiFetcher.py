@@ -15,25 +15,24 @@ class ScadaApiFetcher():
         self.apiBaseUrl = apiBaseUrl
         self.clientId = clientId
         self.clientSecret = clientSecret
+        # keep-alive http session and access token are reused across calls until token expiry
+        self.session = requests.Session()
+        self.accessToken: str = ''
+        self.accessTokenExpiry: dt.datetime = dt.datetime.min
 
-    def fetchData(self, measId: str, startDt: dt.datetime, endDt: dt.datetime) -> List[Tuple[dt.datetime, float]]:
-        """fetches data from scada archive api
-
-        Args:
-            measId (str): measurement Id
-            startDt (dt.datetime): start date
-            endDt (dt.datetime): end date
+    def getAccessToken(self) -> str:
+        """returns cached access token, requests a new one with client credentials if it is missing or about to expire
 
         Returns:
-            List[Tuple[dt.datetime, float]]: data from scada archive api
+            str: access token
         """        
-        apiUrl: str = '{0}/api/scadadata/{1}/{2}/{3}'.format(self.apiBaseUrl, measId, dt.datetime.strftime(
-            startDt, '%Y-%m-%d'), dt.datetime.strftime(endDt, '%Y-%m-%d'))
+        if self.accessToken != '' and dt.datetime.now() < self.accessTokenExpiry:
+            return self.accessToken
 
         # step A, B - single call with client credentials as the basic auth header - will return access_token
         data = {'grant_type': 'client_credentials'}
 
-        access_token_response = requests.post(
+        access_token_response = self.session.post(
             self.tokenUrl, data=data, verify=False, allow_redirects=False, auth=(self.clientId, self.clientSecret))
 
         # print(access_token_response.headers)
@@ -42,25 +41,57 @@ class ScadaApiFetcher():
         tokens = json.loads(access_token_response.text)
 
         # print("access token: " + tokens['access_token'])
+        self.accessToken = tokens['access_token']
+        # token without expires_in is used for a single call only, otherwise renewed a minute before expiry
+        expiresInSecs = float(tokens.get('expires_in', 0))
+        self.accessTokenExpiry = dt.datetime.now() + dt.timedelta(seconds=expiresInSecs - 60)
+        return self.accessToken
+
+    def fetchEpochData(self, measId: str, startDt: dt.datetime, endDt: dt.datetime) -> List[Tuple[float, float]]:
+        """fetches data from scada archive api without converting epoch timestamps
+
+        Args:
+            measId (str): measurement Id
+            startDt (dt.datetime): start date
+            endDt (dt.datetime): end date
+
+        Returns:
+            List[Tuple[float, float]]: (epoch milliseconds, value) data from scada archive api
+        """        
+        apiUrl: str = '{0}/api/scadadata/{1}/{2}/{3}'.format(self.apiBaseUrl, measId, dt.datetime.strftime(
+            startDt, '%Y-%m-%d'), dt.datetime.strftime(endDt, '%Y-%m-%d'))
 
         # step B - with the returned access_token we can make as many calls as we want
 
         api_call_headers = {
-            'Authorization': 'Bearer ' + tokens['access_token']}
-        respSegs = (requests.get(
+            'Authorization': 'Bearer ' + self.getAccessToken()}
+        respSegs = (self.session.get(
             apiUrl, headers=api_call_headers, verify=False)).text[1:-1].split(',')
         # print('splitend = {0}'.format(dt.datetime.now()))
-        scadaData: List[Tuple[dt.datetime, float]] = []
+        scadaData: List[Tuple[float, float]] = []
         try:
             for samplInd in range(0, int(len(respSegs)/2)):
-                ts = self.convertEpochMsToDt(float(respSegs[2*samplInd]))
+                epochMs = float(respSegs[2*samplInd])
                 val = float(respSegs[2*samplInd+1])
-                scadaData.append((ts, val))
+                scadaData.append((epochMs, val))
             return scadaData
         except Exception as inst:
             print(inst)
             return[]
 
+    def fetchData(self, measId: str, startDt: dt.datetime, endDt: dt.datetime) -> List[Tuple[dt.datetime, float]]:
+        """fetches data from scada archive api
+
+        Args:
+            measId (str): measurement Id
+            startDt (dt.datetime): start date
+            endDt (dt.datetime): end date
+
+        Returns:
+            List[Tuple[dt.datetime, float]]: data from scada archive api
+        """        
+        return [(self.convertEpochMsToDt(epochMs), val) for epochMs, val in self.fetchEpochData(measId, startDt, endDt)]
+
     def convertEpochMsToDt(self, epochMs: float) -> dt.datetime:
         timeObj = dt.datetime.fromtimestamp(epochMs/1000)
         return timeObj
@@ -0,0 +1,130 @@
+import datetime as dt
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+
+class DayWisePipelineExecutor():
+    """runs fetch -> transform -> write stages of day wise jobs concurrently, connected by bounded queues.
+    Day N+1 fetch overlaps day N transform and day N-1 write, while days still leave each stage in input order.
+    """
+
+    # marker pushed through the queues once all days are consumed
+    _endOfStream = object()
+
+    def __init__(self, fetchFn: Callable[[dt.datetime], Any], transformFn: Callable[[Any], Any], writeFn: Callable[[Any], bool], queueSize: int = 2) -> None:
+        """initialize stage functions and queue size
+        Args:
+            fetchFn (Callable[[dt.datetime], Any]): fetch stage, takes day and returns raw data
+            transformFn (Callable[[Any], Any]): transform stage, takes raw data and returns data to write
+            writeFn (Callable[[Any], bool]): write stage, takes transformed data and returns true if write is success
+            queueSize (int, optional): max number of days buffered between two stages. Defaults to 2.
+        """
+        self.stageFns: Dict[str, Callable] = {'fetch': fetchFn, 'transform': transformFn, 'write': writeFn}
+        self.queueSize = queueSize
+        self.fetchToTransformQueue: queue.Queue = queue.Queue(maxsize=queueSize)
+        self.transformToWriteQueue: queue.Queue = queue.Queue(maxsize=queueSize)
+        self.stageBusySecs: Dict[str, float] = {stage: 0.0 for stage in self.stageFns}
+        self.stageDaysProcessed: Dict[str, int] = {stage: 0 for stage in self.stageFns}
+        self.stageDaysFailed: Dict[str, int] = {stage: 0 for stage in self.stageFns}
+        self.queueDepthSamples: Dict[str, List[int]] = {'fetchToTransform': [], 'transformToWrite': []}
+        self.daySuccessDict: Dict[dt.datetime, bool] = {}
+        self.wallSecs = 0.0
+        self._lock = threading.Lock()
+
+    def getQueueDepths(self) -> Dict[str, int]:
+        """returns current number of days waiting in each queue
+        Returns:
+            Dict[str, int]: queue name -> current depth
+        """
+        return {'fetchToTransform': self.fetchToTransformQueue.qsize(), 'transformToWrite': self.transformToWriteQueue.qsize()}
+
+    def getStats(self) -> dict:
+        """returns per stage utilization and queue depth statistics of last run
+        Returns:
+            dict: stats['stages'][stage] = {busySecs, utilization, daysProcessed, daysFailed}
+                  stats['queues'][queueName] = {maxDepth, meanDepth}
+                  stats['wallSecs'] = wall clock time of run
+        """
+        stats: dict = {'wallSecs': self.wallSecs, 'queueSize': self.queueSize, 'stages': {}, 'queues': {}}
+        for stage, busySecs in self.stageBusySecs.items():
+            utilization = busySecs/self.wallSecs if self.wallSecs > 0 else 0.0
+            stats['stages'][stage] = {'busySecs': busySecs, 'utilization': utilization,
+                                      'daysProcessed': self.stageDaysProcessed[stage], 'daysFailed': self.stageDaysFailed[stage]}
+        for queueName, depthSamples in self.queueDepthSamples.items():
+            meanDepth = sum(depthSamples)/len(depthSamples) if len(depthSamples) > 0 else 0.0
+            stats['queues'][queueName] = {'maxDepth': max(depthSamples, default=0), 'meanDepth': meanDepth}
+        return stats
+
+    def _runStage(self, stage: str, inp: Any) -> Any:
+        """runs stage function on input and accumulates busy time of stage, returns None if stage raised.
+        stage is counted as failed if it raised or returned None/False, as processed otherwise"""
+        startTime = time.perf_counter()
+        try:
+            out = self.stageFns[stage](inp)
+        except Exception as err:
+            print('error in {0} stage'.format(stage), err)
+            out = None
+        with self._lock:
+            self.stageBusySecs[stage] += time.perf_counter() - startTime
+            if out is None or out is False:
+                self.stageDaysFailed[stage] += 1
+            else:
+                self.stageDaysProcessed[stage] += 1
+        return out
+
+    def _put(self, queueName: str, q: queue.Queue, item: Any) -> None:
+        """blocking put of a day on bounded queue, samples queue depth after put"""
+        q.put(item)
+        with self._lock:
+            self.queueDepthSamples[queueName].append(q.qsize())
+
+    def _putEndOfStream(self, q: queue.Queue) -> None:
+        """end marker is not a queued day, so queue depth is not sampled"""
+        q.put(self._endOfStream)
+
+    def _fetchWorker(self, days: List[dt.datetime]) -> None:
+        for day in days:
+            rawData = self._runStage('fetch', day)
+            self._put('fetchToTransform', self.fetchToTransformQueue, (day, rawData))
+        self._putEndOfStream(self.fetchToTransformQueue)
+
+    def _transformWorker(self) -> None:
+        while True:
+            item = self.fetchToTransformQueue.get()
+            if item is self._endOfStream:
+                break
+            day, rawData = item
+            # failed fetch is passed on as failure without transforming
+            data = None if rawData is None else self._runStage('transform', rawData)
+            self._put('transformToWrite', self.transformToWriteQueue, (day, data))
+        self._putEndOfStream(self.transformToWriteQueue)
+
+    def _writeWorker(self) -> None:
+        while True:
+            item = self.transformToWriteQueue.get()
+            if item is self._endOfStream:
+                break
+            day, data = item
+            isWriteSuccess = False if data is None else bool(self._runStage('write', data))
+            self.daySuccessDict[day] = isWriteSuccess
+
+    def run(self, days: List[dt.datetime]) -> Dict[dt.datetime, bool]:
+        """runs all days through the pipeline and waits for completion
+        Args:
+            days (List[dt.datetime]): days to process, in order
+        Returns:
+            Dict[dt.datetime, bool]: day -> true if day is written successfully, in order of days
+        """
+        self.daySuccessDict = {}
+        startTime = time.perf_counter()
+        workers = [threading.Thread(target=self._fetchWorker, args=(days,), name='pipeline-fetch', daemon=True),
+                   threading.Thread(target=self._transformWorker, name='pipeline-transform', daemon=True),
+                   threading.Thread(target=self._writeWorker, name='pipeline-write', daemon=True)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.wallSecs = time.perf_counter() - startTime
+        return {day: self.daySuccessDict.get(day, False) for day in days}
@@ -1,46 +1,152 @@
 import pandas as pd
 import datetime as dt
-from typing import List, Tuple, Union
+from typing import Dict, List, Optional, Tuple
 import numpy as np
 from src.fetchers.scadaApiFetcher import ScadaApiFetcher
 
+#list of all entities
+listOfEntity =['WRLDCMP.SCADA1.A0047000', 'WRLDCMP.SCADA1.A0046978','WRLDCMP.SCADA1.A0046980', 'WRLDCMP.SCADA1.A0046957', 'WRLDCMP.SCADA1.A0046945']
+# listOfEntity =[ 'WRLDCMP.SCADA1.A0046945']
 
+#filtering hyper parameters of each entity (h1 threshold, h2 window size, lower bound, upper bound)
+filterParamsDict = {'WRLDCMP.SCADA1.A0046945': (250, 5, 1500, 7200),             #chattisgarh
+                    'WRLDCMP.SCADA1.A0046948': (0, 0, 0, 0),
+                    'WRLDCMP.SCADA1.A0046962': (0, 0, 0, 0),
+                    'WRLDCMP.SCADA1.A0046953': (0, 0, 0, 0),
+                    'WRLDCMP.SCADA1.A0046978': (550, 5, 5000, 30000),           #MP
+                    'WRLDCMP.SCADA1.A0046957': (550, 3, 7000, 35000),           #gujarat
+                    'WRLDCMP.SCADA1.A0046980': (550, 5, 8000, 40000),           #maharastra
+                    'WRLDCMP.SCADA1.A0047000': (550, 3, 32775, 78000)}          #WR-total
 
-def toMinuteWiseData(demandDf:pd.core.frame.DataFrame, entity:str)->pd.core.frame.DataFrame:
-    """convert random secondwise demand dataframe to minwise demand dataframe and add entity column to dataframe.
+
+def toLocalMinuteKeys(epochMs: np.ndarray) -> np.ndarray:
+    """map epoch millisecond timestamps to local wall clock minute numbers (minutes since 1970-01-01 00:00 local time) using integer arithmetic.
 
     Args:
-        demandDf (pd.core.frame.DataFrame): random secondwise demand dataframe
-        entity (str): entity name
+        epochMs (np.ndarray): epoch millisecond timestamps
 
     Returns:
-        pd.core.frame.DataFrame: minwise demand dataframe
+        np.ndarray: int64 local minute number of each timestamp
     """    
-    try:
-        demandDf = demandDf.resample('1min', on='timestamp').agg({'demandValue': 'first'})  # this will set timestamp as index of dataframe
-    except Exception as err:
-        print('error while resampling', err)
-    demandDf.insert(0, "entityTag", entity)                      # inserting column entityName with all values of 96 block = entity
-    demandDf.reset_index(inplace=True)
-    return demandDf
+    if len(epochMs) == 0:
+        return np.zeros(0, dtype=np.int64)
+    # local utc offset, same conversion as ScadaApiFetcher.convertEpochMsToDt (no DST in IST, single offset per day)
+    firstEpochSec = float(epochMs[0])/1000
+    utcOffsetMs = int((dt.datetime.fromtimestamp(firstEpochSec) - dt.datetime.fromtimestamp(firstEpochSec, dt.timezone.utc).replace(tzinfo=None)).total_seconds()*1000)
+    return np.floor_divide(np.floor(epochMs).astype(np.int64) + utcOffsetMs, 60000)
 
-def toBlockWiseData(demandDf:pd.core.frame.DataFrame, entity:str)->pd.core.frame.DataFrame:
-    """convert minwise demand dataframe to blockwise demand dataframe and add entity column to dataframe.
+def toDayQualityGrid(qualityDf:pd.core.frame.DataFrame, entity:str, currDate:dt.datetime)-> pd.core.frame.DataFrame:
+    """reindex blockwise quality dataframe onto all 96 blocks of the day, blocks without any sample get sampleCount 0 and gapMinutes 15
 
     Args:
-        demandDf (pd.core.frame.DataFrame): minwise demand dataframe
+        qualityDf (pd.core.frame.DataFrame): blockwise quality dataframe of an entity
         entity (str): entity name
+        currDate (dt.datetime): day of quality dataframe
 
     Returns:
-        pd.core.frame.DataFrame: blockwise demand dataframe
+        pd.core.frame.DataFrame: blockwise quality dataframe with a row for every block of the day
     """    
-    try:
-        demandDf = demandDf.resample('15min', on='timestamp').mean()  # this will set timestamp as index of dataframe
-    except Exception as err:
-        print('error while resampling', err)
-    demandDf.insert(0, "entityTag", entity)                      # inserting column entityName with all values of 96 block = entity
-    demandDf.reset_index(inplace=True)
-    return demandDf
+    dayStart = pd.Timestamp(currDate).normalize()
+    dayBlockTimestamps = pd.date_range(start=dayStart, periods=96, freq='15min')
+    metricCols = ['sampleCount','gapMinutes','hardBoundRejections','hardBoundMinutes','spikeReplacements']
+    dayQualityDf = qualityDf.set_index(pd.DatetimeIndex(qualityDf['timestamp']))[metricCols].reindex(dayBlockTimestamps)
+    dayQualityDf['gapMinutes'] = dayQualityDf['gapMinutes'].fillna(15)
+    dayQualityDf = dayQualityDf.fillna(0).astype(np.int64)
+    dayQualityDf.insert(0, 'entityTag', entity)
+    dayQualityDf.insert(0, 'timestamp', dayBlockTimestamps)
+    return dayQualityDf.reset_index(drop=True)
+
+def aggregateRawToBlockwise(rawDemandDf:pd.core.frame.DataFrame, entity:str, currDate:Optional[dt.datetime]=None)-> Tuple[pd.core.frame.DataFrame, pd.core.frame.DataFrame]:
+    """convert raw secondwise demand to filtered blockwise demand in a single pass and compute per block data quality metrics.
+    raw epoch timestamps are binned to minutes and 15 min blocks with integer arithmetic, first sample of each minute is filtered
+    and block means are computed with bincount instead of resampling twice.
+
+    Args:
+        rawDemandDf (pd.core.frame.DataFrame): raw secondwise demand dataframe(epochMs, demandValue)
+        entity (str): entity name
+        currDate (Optional[dt.datetime]): day of raw data, if given quality rows cover all 96 blocks of the day so that a feed that stops
+            part way through the day shows up as gap blocks, else only blocks from first to last sampled minute
+
+    Returns:
+        Tuple[pd.core.frame.DataFrame, pd.core.frame.DataFrame]: blockwise demand dataframe(timestamp, entityTag, demandValue),
+            blockwise quality dataframe(timestamp, entityTag, sampleCount, gapMinutes, hardBoundRejections, hardBoundMinutes, spikeReplacements).
+            hardBoundRejections counts raw samples outside bounds, gapMinutes, hardBoundMinutes and spikeReplacements count disjoint sets of minutes
+            (no valid sample / first valid sample outside bounds / measured in bound value replaced by spike filter)
+    """    
+    blockwiseDf = pd.DataFrame(columns = ['timestamp','entityTag','demandValue'])
+    qualityDf = pd.DataFrame(columns = ['timestamp','entityTag','sampleCount','gapMinutes','hardBoundRejections','hardBoundMinutes','spikeReplacements'])
+    if len(rawDemandDf) == 0:
+        return blockwiseDf, qualityDf if currDate is None else toDayQualityGrid(qualityDf, entity, currDate)
+
+    # stable sort keeps api order of samples within same timestamp, so first sample of a minute is same as resample 'first'
+    rawDemandDf = rawDemandDf.sort_values('epochMs', kind='mergesort')
+    values = rawDemandDf['demandValue'].values.astype(np.float64)
+    minuteKeys = toLocalMinuteKeys(rawDemandDf['epochMs'].values.astype(np.float64))
+
+    # minute grid spans first to last sampled minute
+    firstMinute = int(minuteKeys[0])
+    numOfMinutes = int(minuteKeys[-1]) - firstMinute + 1
+    minutePos = minuteKeys - firstMinute
+    isValidSample = ~np.isnan(values)
+    lowerBound, upperBound = filterParamsDict[entity][2:]
+    with np.errstate(invalid='ignore'):
+        isOutOfBoundSample = isValidSample & ((values > upperBound) | (values < lowerBound))
+
+    # first valid sample of each minute, minutes without any valid sample stay nan (gaps)
+    minuteValues = np.full(numOfMinutes, np.nan)
+    uniqueMinutePos, firstSampleInd = np.unique(minutePos[isValidSample], return_index=True)
+    minuteValues[uniqueMinutePos] = values[isValidSample][firstSampleInd]
+    sampleCountPerMinute = np.bincount(minutePos, minlength=numOfMinutes)
+
+    # applying filtering logic on minutewise data
+    minuteTimestamps = pd.Timestamp('1970-01-01') + pd.to_timedelta(firstMinute + np.arange(numOfMinutes), unit='min')
+    minutewiseDf = pd.DataFrame({'timestamp': minuteTimestamps, 'entityTag': entity, 'demandValue': minuteValues})
+    filteredDf = applyFilteringToDf(minutewiseDf, entity)
+
+    # block number of each minute relative to first block, block means and metrics in one bincount pass each
+    firstBlock = firstMinute//15
+    blockPos = (firstMinute + np.arange(numOfMinutes))//15 - firstBlock
+    numOfBlocks = int(blockPos[-1]) + 1
+    filteredValues = filteredDf['demandValue'].values.astype(np.float64)
+    isGapMinute = np.isnan(minuteValues)
+    isHardMinute = filteredDf['hardFiltered'].values.astype(bool)
+    # interpolated gap and hard bound minutes are not measured values, so they are not counted again as spikes
+    isSpikeMinute = filteredDf['spikeFiltered'].values.astype(bool) & ~isGapMinute & ~isHardMinute
+    sampleBlockPos = minuteKeys//15 - firstBlock
+    isFilteredValid = ~np.isnan(filteredValues)
+    blockSum = np.bincount(blockPos, weights=np.where(isFilteredValid, filteredValues, 0), minlength=numOfBlocks)
+    blockValidCount = np.bincount(blockPos, weights=isFilteredValid, minlength=numOfBlocks)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        blockMean = np.where(blockValidCount > 0, blockSum/blockValidCount, np.nan)
+
+    blockTimestamps = pd.Timestamp('1970-01-01') + pd.to_timedelta((firstBlock + np.arange(numOfBlocks))*15, unit='min')
+    blockwiseDf = pd.DataFrame({'timestamp': blockTimestamps, 'entityTag': entity, 'demandValue': blockMean})
+    qualityDf = pd.DataFrame({'timestamp': blockTimestamps, 'entityTag': entity,
+                              'sampleCount': np.bincount(blockPos, weights=sampleCountPerMinute, minlength=numOfBlocks).astype(np.int64),
+                              # minutes of 15 min block without any valid sample
+                              'gapMinutes': 15 - np.bincount(blockPos, weights=~isGapMinute, minlength=numOfBlocks).astype(np.int64),
+                              'hardBoundRejections': np.bincount(sampleBlockPos, weights=isOutOfBoundSample, minlength=numOfBlocks).astype(np.int64),
+                              'hardBoundMinutes': np.bincount(blockPos, weights=isHardMinute, minlength=numOfBlocks).astype(np.int64),
+                              'spikeReplacements': np.bincount(blockPos, weights=isSpikeMinute, minlength=numOfBlocks).astype(np.int64)})
+    if currDate is not None:
+        qualityDf = toDayQualityGrid(qualityDf, entity, currDate)
+    return blockwiseDf, qualityDf
+
+def purityPercentage(qualityDf:pd.core.frame.DataFrame)-> float:
+    """percentage of minutes of blocks whose measured value was kept by hard bound and spike filters
+
+    Args:
+        qualityDf (pd.core.frame.DataFrame): blockwise quality dataframe of an entity
+
+    Returns:
+        float: purity percentage
+    """    
+    totalMinutes = 15*len(qualityDf)
+    if totalMinutes == 0:
+        return 0.0
+    # gap, hard bound and spike minutes do not overlap
+    pureMinutes = totalMinutes - qualityDf['gapMinutes'].sum() - qualityDf['hardBoundMinutes'].sum() - qualityDf['spikeReplacements'].sum()
+    return float(100*pureMinutes/totalMinutes)
 
 def filterAction(demandDf :pd.core.frame.DataFrame, h1:int, h2:int, lowerBound:int, upperBound:int)-> pd.core.frame.DataFrame:
     """applying filtering to df by setting hyper parameters h1, h2.
@@ -53,7 +159,7 @@ def filterAction(demandDf :pd.core.frame.DataFrame, h1:int, h2:int, lowerBound:i
         upperBound (int): upper Bound Demand value
 
     Returns:
-        pd.core.frame.DataFrame: filtered dataframe df
+        pd.core.frame.DataFrame: filtered dataframe df, with hardFiltered and spikeFiltered mask columns
     """    
     threshold = h1
     windowSize = h2
@@ -73,6 +179,9 @@ def filterAction(demandDf :pd.core.frame.DataFrame, h1:int, h2:int, lowerBound:i
     demandDf['diff'] = np.abs(demandDf["demandValue"] - demandDf["Spikes"])
     rollingMedianMask= demandDf['diff']> threshold
     demandDf.loc[rollingMedianMask,'demandValue']= np.nan
+    #keeping filter masks for data quality metrics
+    demandDf['hardFiltered'] = hardFilterMask.values
+    demandDf['spikeFiltered'] = rollingMedianMask.values
 
     #filling outliers with time interpolation
     # print(demandDf['demandValue'].isna().sum())
@@ -92,23 +201,8 @@ def applyFilteringToDf(demandDf : pd.core.frame.DataFrame, entity:str)-> pd.core
     Returns:
         filtered dataframe.
     """    
-    if entity == 'WRLDCMP.SCADA1.A0046945':                             #chattisgarh
-        filteredDf = filterAction(demandDf,250,5,1500,7200)
-
-    if entity == 'WRLDCMP.SCADA1.A0046948' or entity == 'WRLDCMP.SCADA1.A0046962' or entity == 'WRLDCMP.SCADA1.A0046953':
-        filteredDf = filterAction(demandDf,0,0,0,0)
-    
-    if  entity == 'WRLDCMP.SCADA1.A0046978' :                           #MP
-        filteredDf = filterAction(demandDf,550,5,5000,30000)
-
-    if entity == 'WRLDCMP.SCADA1.A0046957' :                            #gujarat
-        filteredDf = filterAction(demandDf,550,3,7000,35000)
-
-    if entity == 'WRLDCMP.SCADA1.A0046980':                             #maharastra
-        filteredDf = filterAction(demandDf,550,5,8000,40000)
-
-    if entity == 'WRLDCMP.SCADA1.A0047000':                             #WR-total
-        filteredDf = filterAction(demandDf, 550, 3, 32775, 78000)
+    h1, h2, lowerBound, upperBound = filterParamsDict[entity]
+    filteredDf = filterAction(demandDf, h1, h2, lowerBound, upperBound)
         
     return filteredDf
 
@@ -127,55 +221,88 @@ def toListOfTuple(df:pd.core.frame.DataFrame) -> List[Tuple]:
         data.append(tempTuple)
     return data
 
+def toQualityListOfTuple(df:pd.core.frame.DataFrame) -> List[Tuple]:
+    """convert blockwise data quality metrics to list of tuples
 
-def fetchDemandDataFromApi(currDate: dt.datetime, configDict: dict)-> List[Union[dt.datetime, str, float]]:
-    """fetches demand data from api-> passes to filtering pipeline->resample to blockwise->generate list of tuple
+    Args:
+        df (pd.core.frame.DataFrame): blockwise quality dataframe
+
+    Returns:
+        List[Tuple]: list of tuple of (timestamp, entityTag, sampleCount, gapMinutes, hardBoundRejections, hardBoundMinutes, spikeReplacements)
+    """    
+    data:List[Tuple] = []
+    for ind in df.index:
+        tempTuple = (str(df['timestamp'][ind]), df['entityTag'][ind], int(df['sampleCount'][ind]), int(df['gapMinutes'][ind]),
+                     int(df['hardBoundRejections'][ind]), int(df['hardBoundMinutes'][ind]), int(df['spikeReplacements'][ind]))
+        data.append(tempTuple)
+    return data
+
+
+def fetchRawDemandData(currDate: dt.datetime, configDict: dict, obj_scadaApiFetcher: Optional[ScadaApiFetcher] = None)-> Dict[str, pd.core.frame.DataFrame]:
+    """fetches raw secondwise demand data of all entities from api for a single day (network bound stage of pipeline)
 
     Args:
         currDate (dt.datetime): currant date
         configDict (dict): application dictionary
+        obj_scadaApiFetcher (Optional[ScadaApiFetcher]): api fetcher to reuse (warm http session), created from configDict if not given
 
     Returns:
-        dict: demand_purity_dict['data'] = per min demand data for each entity in form of list of tuple
-              demand_purity_dict['purityPercentage'] = purity percentage of each entity in form of list of tuple
+        Dict[str, pd.core.frame.DataFrame]: entity tag -> raw secondwise demand dataframe(epochMs, demandValue)
+    """    
+    if obj_scadaApiFetcher is None:
+        #creating object of ScadaApiFetcher class 
+        obj_scadaApiFetcher = ScadaApiFetcher(configDict['tokenUrl'], configDict['apiBaseUrl'], configDict['clientId'], configDict['clientSecret'])
+
+    rawDemandDict: Dict[str, pd.core.frame.DataFrame] = {}
+    for entity in listOfEntity:
+        # fetching secondwise data from api for each entity(epoch ms,value) and converting to dataframe
+        resData = obj_scadaApiFetcher.fetchEpochData(entity, currDate, currDate)
+        rawDemandDict[entity] = pd.DataFrame(resData, columns =['epochMs','demandValue']) 
+    return rawDemandDict
+
 
+def transformRawDemandData(rawDemandDict: Dict[str, pd.core.frame.DataFrame], currDate: Optional[dt.datetime] = None)-> dict:
+    """passes raw demand data of each entity to single pass filtering and blockwise aggregation->generate list of tuple (cpu bound stage of pipeline)
+
+    Args:
+        rawDemandDict (Dict[str, pd.core.frame.DataFrame]): entity tag -> raw secondwise demand dataframe(epochMs, demandValue)
+        currDate (Optional[dt.datetime]): day of raw data, quality metrics and purity cover all 96 blocks of the day if given
+
+    Returns:
+        dict: demand_purity_dict['data'] = blockwise demand data for each entity in form of list of tuple (timestamp, entityTag, demandValue)
+              demand_purity_dict['qualityData'] = blockwise data quality metrics for each entity in form of list of tuple
+                    (timestamp, entityTag, sampleCount, gapMinutes, hardBoundRejections, hardBoundMinutes, spikeReplacements)
+              demand_purity_dict['purityPercentage'] = purity percentage of each entity in form of list of tuple (entityTag, purityPercentage)
     """    
-    tokenUrl: str = configDict['tokenUrl']
-    apiBaseUrl: str = configDict['apiBaseUrl']
-    clientId = configDict['clientId']
-    clientSecret = configDict['clientSecret']
+    data:List[Tuple] = []
+    qualityData:List[Tuple] = []
+    purityData:List[Tuple] = []
 
-    
-    #initializing temporary empty dataframe that append demand values of all entities
-    storageDf = pd.DataFrame(columns = [ 'timestamp','entityTag','demandValue']) 
+    for entity, rawDemandDf in rawDemandDict.items():
+        #filtering and converting to blockwise demand data along with per block quality metrics
+        blockwiseDf, qualityDf = aggregateRawToBlockwise(rawDemandDf, entity, currDate)
 
-    #list of all entities
-    listOfEntity =['WRLDCMP.SCADA1.A0047000', 'WRLDCMP.SCADA1.A0046978','WRLDCMP.SCADA1.A0046980', 'WRLDCMP.SCADA1.A0046957', 'WRLDCMP.SCADA1.A0046945']
-    # listOfEntity =[ 'WRLDCMP.SCADA1.A0046945']
-    
-    #creating object of ScadaApiFetcher class 
-    obj_scadaApiFetcher = ScadaApiFetcher(tokenUrl, apiBaseUrl, clientId, clientSecret)
+        data.extend(toListOfTuple(blockwiseDf))
+        qualityData.extend(toQualityListOfTuple(qualityDf))
+        purityData.append((entity, purityPercentage(qualityDf)))
 
-    for entity in listOfEntity:
-        # fetching secondwise data from api for each entity(timestamp,value) and converting to dataframe
-        resData = obj_scadaApiFetcher.fetchData(entity, currDate, currDate)
-        demandDf = pd.DataFrame(resData, columns =['timestamp','demandValue']) 
-
-        #converting to minutewise data and adding entityName column to dataframe
-        demandDf = toMinuteWiseData(demandDf,entity)
-       
-        #applying filtering logic
-        filteredDf = applyFilteringToDf(demandDf,entity)
-        # filteredDf.to_excel(r'D:\wrldc_projects\demand_forecasting\filtering demo\filtered_Wr_dec_jan.xlsx')
-        #converting to blockwise demand data and adding entityName column to dataframe
-        blockwiseDf = toBlockWiseData(filteredDf,entity)
-
-        #appending per min demand data for each entity to tempDf
-        storageDf = pd.concat([storageDf, blockwiseDf],ignore_index=True)
+    return {'data': data, 'qualityData': qualityData, 'purityPercentage': purityData}
 
+
+def fetchDemandDataFromApi(currDate: dt.datetime, configDict: dict)-> dict:
+    """fetches demand data from api-> passes to filtering pipeline->resample to blockwise->generate list of tuple
+
+    Args:
+        currDate (dt.datetime): currant date
+        configDict (dict): application dictionary
+
+    Returns:
+        dict: demand_purity_dict['data'] = blockwise demand data for each entity in form of list of tuple
+              demand_purity_dict['qualityData'] = blockwise data quality metrics for each entity in form of list of tuple
+              demand_purity_dict['purityPercentage'] = purity percentage of each entity in form of list of tuple
+
+    """    
+    rawDemandDict = fetchRawDemandData(currDate, configDict)
+    demandPurityDict = transformRawDemandData(rawDemandDict, currDate)
     
-    # converting storageDf(contain per min demand values of all entities) to list of tuple 
-    data:List[Tuple] = toListOfTuple(storageDf)
-    
-    return data
-    
\ No newline at end of file
+    return demandPurityDict
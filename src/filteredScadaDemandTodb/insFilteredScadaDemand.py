@@ -1,37 +1,66 @@
 import datetime as dt
-from typing import List, Tuple, Union
-from src.filteredScadaDemandTodb.demandDataFetcher import fetchDemandDataFromApi
-from src.filteredScadaDemandTodb.filteredBlockwiseDemandToDb import InterpolatedBlockWiseDemandInsRepo
+from typing import Dict, List, Optional
+from src.filteredScadaDemandTodb.demandDataFetcher import fetchRawDemandData, transformRawDemandData
+from src.filteredScadaDemandTodb.dayWisePipelineExecutor import DayWisePipelineExecutor
+from src.fetchers.scadaApiFetcher import ScadaApiFetcher
+from src.storage.storageBackend import StorageBackend
+from src.storage.storageBackendFactory import getStorageBackend
 
 
 
-def insFilteredScadaDemand(startDate:dt.datetime ,endDate: dt.datetime, configDict:dict)->bool:
+def insFilteredScadaDemand(startDate:dt.datetime ,endDate: dt.datetime, configDict:dict, storageBackend:Optional[StorageBackend]=None,
+                           obj_scadaApiFetcher:Optional[ScadaApiFetcher]=None)->bool:
     """ push raw scada data to db after passing through filtering pipeline
     Args:
         startDate (dt.datetime): start date
         endDate (dt.datetime): end date
         configDict (dict):   apllication configuration dictionary
+        storageBackend (Optional[StorageBackend]): storage backend, created from configDict if not given
+        obj_scadaApiFetcher (Optional[ScadaApiFetcher]): api fetcher to reuse (warm http session), created from configDict if not given
     Returns:
         bool: return true if insertion is success.
     """    
 
     
-    conString:str = configDict['con_string_mis_warehouse']
+    if storageBackend is None:
+        storageBackend = getStorageBackend(configDict)
+    if obj_scadaApiFetcher is None:
+        # single fetcher for all days so that http session and access token are reused
+        obj_scadaApiFetcher = ScadaApiFetcher(configDict['tokenUrl'], configDict['apiBaseUrl'], configDict['clientId'], configDict['clientSecret'])
+    # number of days buffered between fetch, transform and write stages
+    queueSize = int(configDict.get('pipeline_queue_size', 2))
 
-    #creating instance of class
-    obj_interpolatedBlockwiseDemandInsRepo = InterpolatedBlockWiseDemandInsRepo(conString)
+    def writeDemandData(demandPurityDict:dict)->bool:
+        for entity, purity in demandPurityDict['purityPercentage']:
+            print('{0} purity = {1:.2f}%'.format(entity, purity))
+        return storageBackend.insertBlockwiseDemand(demandPurityDict['data'], demandPurityDict['qualityData'])
+
+    # day is passed on with raw data so that quality metrics cover all blocks of the day
+    obj_pipelineExecutor = DayWisePipelineExecutor(fetchFn=lambda currDate: (currDate, fetchRawDemandData(currDate, configDict, obj_scadaApiFetcher)),
+                                                   transformFn=lambda dayRawDemand: transformRawDemandData(dayRawDemand[1], dayRawDemand[0]),
+                                                   writeFn=writeDemandData,
+                                                   queueSize=queueSize)
     
-    insertSuccessCount=0
+    days:List[dt.datetime] = []
     currDate = startDate
-    
-    # Iterating through each day and inserting filtered scada data 
     while currDate <= endDate:
-        data:List[Union[dt.datetime, str, float]] = fetchDemandDataFromApi(currDate, configDict)
-        # print(data)
-        isInsertionSuccess = obj_interpolatedBlockwiseDemandInsRepo.insertBlockWiseDemand(data)
-        if isInsertionSuccess:
-            insertSuccessCount = insertSuccessCount + 1
+        days.append(currDate)
         currDate += dt.timedelta(days=1)
+
+    # fetch of next day, filtering of current day and db insertion of previous day run concurrently
+    daySuccessDict:Dict[dt.datetime, bool] = obj_pipelineExecutor.run(days)
+    insertSuccessCount = sum(daySuccessDict.values())
+    for day, isInsertionSuccess in daySuccessDict.items():
+        if not isInsertionSuccess:
+            print('filtered scada demand insertion failure for {0}'.format(dt.datetime.strftime(day, '%Y-%m-%d')))
+
+    stats = obj_pipelineExecutor.getStats()
+    print('pipeline wall time = {0:.1f}s'.format(stats['wallSecs']))
+    for stage, stageStats in stats['stages'].items():
+        print('{0} stage: busy = {1:.1f}s, utilization = {2:.0%}, days processed = {3}, days failed = {4}'.format(stage, stageStats['busySecs'], stageStats['utilization'],
+                                                                                                              stageStats['daysProcessed'], stageStats['daysFailed']))
+    for queueName, queueStats in stats['queues'].items():
+        print('{0} queue: max depth = {1}, mean depth = {2:.2f}'.format(queueName, queueStats['maxDepth'], queueStats['meanDepth']))
     
     numOfDays = (endDate-startDate).days
 
@@ -40,4 +69,4 @@ def insFilteredScadaDemand(startDate:dt.datetime ,endDate: dt.datetime, configDi
         return True
     else:
         return False
-    
\ No newline at end of file
+    
@@ -0,0 +1,85 @@
+import datetime as dt
+from typing import Dict, List, Optional, Tuple
+from src.fetchers.scadaApiFetcher import ScadaApiFetcher
+from src.filteredScadaDemandTodb.demandDataFetcher import listOfEntity
+from src.filteredScadaDemandTodb.streamingSpikeFilter import StreamingSpikeFilter
+from src.storage.storageBackend import StorageBackend
+
+
+class IntradayDemandIngest():
+    """near real time filtered blockwise demand of today. each poll fetches today's raw samples of every entity (api returns samples so far),
+    pushes only samples newer than the last one seen to the entity's StreamingSpikeFilter and writes the blocks it emits.
+    on first poll of a new day, the previous day is polled once more and flushed, so that its last blocks are written too.
+    nightly insFilteredScadaDemand of the day overwrites these blocks with batch filtered blocks and quality metrics.
+    """
+
+    def __init__(self, storageBackend: StorageBackend, obj_scadaApiFetcher: ScadaApiFetcher) -> None:
+        """initialize per entity streaming filters
+        Args:
+            storageBackend (StorageBackend): storage backend blocks are written to
+            obj_scadaApiFetcher (ScadaApiFetcher): api fetcher
+        """
+        self.storageBackend = storageBackend
+        self.obj_scadaApiFetcher = obj_scadaApiFetcher
+        self.streamingFilterDict: Dict[str, StreamingSpikeFilter] = {entity: StreamingSpikeFilter(entity) for entity in listOfEntity}
+        self.lastEpochMsDict: Dict[str, float] = {}
+        self.currDate: Optional[dt.datetime] = None
+
+    def _pollEntity(self, entity: str, isEndOfDay: bool) -> Tuple[List[Tuple], bool]:
+        """push new samples of entity and return emitted blocks as list of tuple (timestamp, entityTag, demandValue) and fetch success.
+        at end of day the filter is always flushed and reset, even if the last fetch failed, so that next day never continues this day's state"""
+        obj_streamingSpikeFilter = self.streamingFilterDict[entity]
+        blocks: List[Tuple[dt.datetime, float]] = []
+        isFetchSuccess = True
+        try:
+            resData = self.obj_scadaApiFetcher.fetchEpochData(entity, self.currDate, self.currDate)
+            lastEpochMs = self.lastEpochMsDict.get(entity, float('-inf'))
+            newSamples = sorted([sample for sample in resData if sample[0] > lastEpochMs], key=lambda sample: sample[0])
+            if len(newSamples) > 0:
+                self.lastEpochMsDict[entity] = newSamples[-1][0]
+            blocks = obj_streamingSpikeFilter.push(newSamples)['blocks']
+        except Exception as err:
+            print('error while intraday polling of {0}'.format(entity), err)
+            isFetchSuccess = False
+        finally:
+            if isEndOfDay:
+                try:
+                    numOfLateSamples = obj_streamingSpikeFilter.getStats()['numOfLateSamples']
+                    if numOfLateSamples > 0:
+                        print('{0} late samples dropped for {1}'.format(numOfLateSamples, entity))
+                    blocks += obj_streamingSpikeFilter.flush()['blocks']
+                finally:
+                    obj_streamingSpikeFilter.reset()
+        return [(str(timestamp), entity, float(demandValue)) for timestamp, demandValue in blocks], isFetchSuccess
+
+    def _pollDay(self, isEndOfDay: bool) -> Tuple[int, bool]:
+        data: List[Tuple] = []
+        isFetchSuccess = True
+        for entity in listOfEntity:
+            entityData, isEntityFetchSuccess = self._pollEntity(entity, isEndOfDay)
+            data.extend(entityData)
+            isFetchSuccess = isFetchSuccess and isEntityFetchSuccess
+        if len(data) == 0:
+            return 0, isFetchSuccess
+        # blocks of entities that were fetched (and flushed blocks) are written even if another fetch failed
+        isWriteSuccess = self.storageBackend.insertBlockwiseDemand(data)
+        return len(data), isFetchSuccess and isWriteSuccess
+
+    def poll(self, now: Optional[dt.datetime] = None) -> Tuple[int, bool]:
+        """fetch new samples of today for all entities, filter them and write completed blocks
+        Args:
+            now (Optional[dt.datetime]): current time, dt.datetime.now() if not given
+        Returns:
+            Tuple[int, bool]: number of blocks written, true if all fetches and the write are success
+        """
+        if now is None:
+            now = dt.datetime.now()
+        today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+        numOfBlocks, isSuccess = 0, True
+        if self.currDate is not None and self.currDate != today:
+            # remaining samples of previous day and its edge minutes and last block
+            numOfBlocks, isSuccess = self._pollDay(isEndOfDay=True)
+            self.lastEpochMsDict = {}
+        self.currDate = today
+        numOfTodayBlocks, isTodaySuccess = self._pollDay(isEndOfDay=False)
+        return numOfBlocks + numOfTodayBlocks, isSuccess and isTodaySuccess
@@ -0,0 +1,264 @@
+import datetime as dt
+from collections import deque
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+from src.filteredScadaDemandTodb.demandDataFetcher import aggregateRawToBlockwise, filterParamsDict, toLocalMinuteKeys
+
+
+class _GapFiller():
+    """streaming equivalent of series.interpolate(method="time").ffill().bfill() on an evenly spaced minute series.
+    a run of nan minutes is held back (pending gap) until the next valid minute arrives or the day is flushed.
+    """
+
+    def __init__(self) -> None:
+        self.lastGood: Optional[Tuple[int, float]] = None
+        self.pendingGap: List[int] = []
+
+    def push(self, ind: int, value: float) -> List[Tuple[int, float]]:
+        """add minute value, returns minutes that are final now as list of (minute index, filled value)"""
+        if np.isnan(value):
+            self.pendingGap.append(ind)
+            return []
+        filled: List[Tuple[int, float]] = []
+        if len(self.pendingGap) > 0:
+            if self.lastGood is None:
+                # leading gap, bfill
+                filled = [(gapInd, value) for gapInd in self.pendingGap]
+            else:
+                # inner gap, linear interpolation between last good and current minute
+                lastInd, lastValue = self.lastGood
+                filled = [(gapInd, lastValue + (value - lastValue)*(gapInd - lastInd)/(ind - lastInd)) for gapInd in self.pendingGap]
+            self.pendingGap = []
+        filled.append((ind, value))
+        self.lastGood = (ind, value)
+        return filled
+
+    def flush(self) -> List[Tuple[int, float]]:
+        """end of series, trailing gap is ffilled with last good value (nan if there was none)"""
+        lastValue = np.nan if self.lastGood is None else self.lastGood[1]
+        filled = [(gapInd, lastValue) for gapInd in self.pendingGap]
+        self.pendingGap = []
+        return filled
+
+
+class StreamingSpikeFilter():
+    """incremental version of filterAction + blockwise aggregation of a single entity for near real time ingest.
+    accepts raw samples in small batches and emits filtered minutes and completed 15 min blocks as soon as they can no longer change,
+    i.e. within one rolling median window of latency (longer only while a gap or spike is waiting for its next good value).
+    output of a full day is same as aggregateRawToBlockwise of that day.
+    """
+
+    def __init__(self, entity: str, h1: Optional[int] = None, h2: Optional[int] = None, lowerBound: Optional[int] = None, upperBound: Optional[int] = None) -> None:
+        """initialize filter hyper parameters, entity's filterParamsDict values are used if not given
+        Args:
+            entity (str): entity tag like 'WRLDCMP.SCADA1.A0047000'
+            h1 (Optional[int]): threshold hyper parameter h1
+            h2 (Optional[int]): window size hyper parameter h2
+            lowerBound (Optional[int]): lower bound demand value
+            upperBound (Optional[int]): upper Bound Demand value
+        """
+        defaultParams = filterParamsDict.get(entity, (None, None, None, None))
+        self.entity = entity
+        self.threshold = defaultParams[0] if h1 is None else h1
+        self.windowSize = defaultParams[1] if h2 is None else h2
+        self.lowerBound = defaultParams[2] if lowerBound is None else lowerBound
+        self.upperBound = defaultParams[3] if upperBound is None else upperBound
+        # window covering minutes [c - windowSize//2, c + (windowSize-1)//2] gives median of minute c, same as centered pandas rolling
+        self.medianLag = (self.windowSize - 1)//2
+        self.reset()
+
+    def reset(self) -> None:
+        """clear all per day state"""
+        # raw samples -> minutes
+        self.firstMinuteKey: Optional[int] = None
+        self.currMinuteKey: Optional[int] = None
+        self.currMinuteValue = np.nan
+        self.numOfLateSamples = 0
+        # hard bound filtering + interpolation
+        self.hardGapFiller = _GapFiller()
+        # rolling median buffer and minutes waiting for their median
+        self.medianBuffer: deque = deque(maxlen=max(self.windowSize, 1))
+        self.awaitingMedian: deque = deque()
+        self.lastMedian: Optional[float] = None
+        # spike filtering + interpolation
+        self.spikeGapFiller = _GapFiller()
+        # minutes -> blocks
+        self.currBlockKey: Optional[int] = None
+        self.currBlockSum = 0.0
+        self.currBlockCount = 0
+
+    def _minuteTimestamp(self, minuteKey: int) -> dt.datetime:
+        return dt.datetime(1970, 1, 1) + dt.timedelta(minutes=int(minuteKey))
+
+    def _closeMinute(self, minuteKey: int, value: float, output: Dict[str, list]) -> None:
+        """pass a completed minute through hard bound filter, interpolation, spike filter and block aggregation"""
+        if value > self.upperBound or value < self.lowerBound:
+            value = np.nan
+        for ind, filledValue in self.hardGapFiller.push(minuteKey - self.firstMinuteKey, value):
+            self._pushToMedian(ind, filledValue, output)
+
+    def _pushToMedian(self, ind: int, value: float, output: Dict[str, list]) -> None:
+        self.medianBuffer.append(value)
+        self.awaitingMedian.append((ind, value))
+        if self.windowSize >= 1 and len(self.medianBuffer) == self.windowSize:
+            median = float(np.median(np.array(self.medianBuffer)))
+            centerInd = ind - self.medianLag
+            # leading minutes without a full window take the first median (bfill), then the window center itself
+            while len(self.awaitingMedian) > 0 and self.awaitingMedian[0][0] <= centerInd:
+                awaitingInd, awaitingValue = self.awaitingMedian.popleft()
+                self._decideSpike(awaitingInd, awaitingValue, median, output)
+            self.lastMedian = median
+
+    def _decideSpike(self, ind: int, value: float, median: Optional[float], output: Dict[str, list]) -> None:
+        isSpike = median is not None and abs(value - median) > self.threshold
+        for filledInd, filledValue in self.spikeGapFiller.push(ind, np.nan if isSpike else value):
+            self._emitMinute(filledInd, filledValue, output)
+
+    def _emitMinute(self, ind: int, value: float, output: Dict[str, list]) -> None:
+        minuteKey = self.firstMinuteKey + ind
+        output['minutes'].append((self._minuteTimestamp(minuteKey), value))
+        blockKey = minuteKey//15
+        if self.currBlockKey is not None and blockKey != self.currBlockKey:
+            self._emitBlock(output)
+        self.currBlockKey = blockKey
+        if not np.isnan(value):
+            self.currBlockSum += value
+            self.currBlockCount += 1
+        # last minute of block is final, so block is emitted now instead of with first minute of next block
+        if minuteKey % 15 == 14:
+            self._emitBlock(output)
+
+    def _emitBlock(self, output: Dict[str, list]) -> None:
+        blockMean = self.currBlockSum/self.currBlockCount if self.currBlockCount > 0 else np.nan
+        output['blocks'].append((self._minuteTimestamp(self.currBlockKey*15), blockMean))
+        self.currBlockKey = None
+        self.currBlockSum = 0.0
+        self.currBlockCount = 0
+
+    def getStats(self) -> Dict[str, int]:
+        """returns counters of current day
+        Returns:
+            Dict[str, int]: numOfLateSamples = samples dropped because their minute was already closed
+        """
+        return {'numOfLateSamples': self.numOfLateSamples}
+
+    def push(self, samples: List[Tuple[float, float]]) -> Dict[str, List[Tuple[dt.datetime, float]]]:
+        """add a batch of raw samples (in time order, may continue previous batch) and get newly finalized output
+        Args:
+            samples (List[Tuple[float, float]]): (epoch milliseconds, value) like ScadaApiFetcher.fetchEpochData
+        Returns:
+            Dict[str, List[Tuple[dt.datetime, float]]]: output['minutes'] = finalized filtered minutes (timestamp, demandValue)
+                                                        output['blocks'] = completed 15 min blocks (timestamp, demandValue)
+        """
+        output: Dict[str, list] = {'minutes': [], 'blocks': []}
+        if len(samples) == 0:
+            return output
+        sampleArr = np.array(samples, dtype=np.float64)
+        minuteKeys = toLocalMinuteKeys(sampleArr[:, 0])
+        for minuteKey, value in zip(minuteKeys.tolist(), sampleArr[:, 1].tolist()):
+            if self.currMinuteKey is None:
+                self.firstMinuteKey = minuteKey
+                self.currMinuteKey = minuteKey
+                self.currMinuteValue = value
+            elif minuteKey == self.currMinuteKey:
+                # first valid sample of minute, same as resample 'first'
+                if np.isnan(self.currMinuteValue):
+                    self.currMinuteValue = value
+            elif minuteKey > self.currMinuteKey:
+                self._closeMinute(self.currMinuteKey, self.currMinuteValue, output)
+                # minutes without samples are gaps
+                for gapMinuteKey in range(self.currMinuteKey + 1, minuteKey):
+                    self._closeMinute(gapMinuteKey, np.nan, output)
+                self.currMinuteKey = minuteKey
+                self.currMinuteValue = value
+            else:
+                # sample of an already closed minute cannot change finalized output
+                self.numOfLateSamples += 1
+        return output
+
+    def flush(self) -> Dict[str, List[Tuple[dt.datetime, float]]]:
+        """end of day, finalize all pending minutes (edge medians ffilled, trailing gaps ffilled) and the last block, then reset state
+        Returns:
+            Dict[str, List[Tuple[dt.datetime, float]]]: same as push
+        """
+        output: Dict[str, list] = {'minutes': [], 'blocks': []}
+        if self.currMinuteKey is None:
+            return output
+        self._closeMinute(self.currMinuteKey, self.currMinuteValue, output)
+        for ind, filledValue in self.hardGapFiller.flush():
+            self._pushToMedian(ind, filledValue, output)
+        while len(self.awaitingMedian) > 0:
+            awaitingInd, awaitingValue = self.awaitingMedian.popleft()
+            self._decideSpike(awaitingInd, awaitingValue, self.lastMedian, output)
+        for ind, filledValue in self.spikeGapFiller.flush():
+            self._emitMinute(ind, filledValue, output)
+        if self.currBlockKey is not None:
+            self._emitBlock(output)
+        self.reset()
+        return output
+
+
+def compareWithBatchFilter(rawDemandDf: pd.core.frame.DataFrame, entity: str, batchSize: int = 60) -> dict:
+    """replay a full day of raw samples through StreamingSpikeFilter in small batches and compare blocks with aggregateRawToBlockwise
+
+    Args:
+        rawDemandDf (pd.core.frame.DataFrame): raw secondwise demand dataframe(epochMs, demandValue) of a day
+        entity (str): entity tag
+        batchSize (int): number of samples per pushed batch
+
+    Returns:
+        dict: numOfBlocks (batch), numOfStreamedBlocks, isSameBlocks (timestamps and missing blocks match), maxAbsDiff of block values,
+              numOfLateSamples of streaming filter
+    """
+    rawDemandDf = rawDemandDf.sort_values('epochMs', kind='mergesort')
+    batchBlockwiseDf, _ = aggregateRawToBlockwise(rawDemandDf, entity)
+
+    obj_streamingSpikeFilter = StreamingSpikeFilter(entity)
+    samples = list(zip(rawDemandDf['epochMs'].tolist(), rawDemandDf['demandValue'].tolist()))
+    streamedBlocks: List[Tuple[dt.datetime, float]] = []
+    for batchStart in range(0, len(samples), batchSize):
+        streamedBlocks.extend(obj_streamingSpikeFilter.push(samples[batchStart:batchStart+batchSize])['blocks'])
+    numOfLateSamples = obj_streamingSpikeFilter.getStats()['numOfLateSamples']
+    streamedBlocks.extend(obj_streamingSpikeFilter.flush()['blocks'])
+
+    batchTimestamps = [pd.Timestamp(x) for x in batchBlockwiseDf['timestamp']]
+    streamedTimestamps = [pd.Timestamp(x[0]) for x in streamedBlocks]
+    isSameBlocks = batchTimestamps == streamedTimestamps
+    maxAbsDiff = np.nan
+    if isSameBlocks:
+        batchValues = batchBlockwiseDf['demandValue'].values.astype(np.float64)
+        streamedValues = np.array([x[1] for x in streamedBlocks], dtype=np.float64)
+        isSameBlocks = bool((np.isnan(batchValues) == np.isnan(streamedValues)).all())
+        isBothValid = ~np.isnan(batchValues) & ~np.isnan(streamedValues)
+        maxAbsDiff = float(np.abs(batchValues[isBothValid] - streamedValues[isBothValid]).max()) if isBothValid.any() else 0.0
+    return {'numOfBlocks': len(batchTimestamps), 'numOfStreamedBlocks': len(streamedBlocks), 'isSameBlocks': isSameBlocks, 'maxAbsDiff': maxAbsDiff,
+            'numOfLateSamples': numOfLateSamples}
+
+
+def makeSyntheticRawDay(day: dt.datetime, entity: str, seed: int = 0) -> pd.core.frame.DataFrame:
+    """raw secondwise demand of a day for offline replay checks, with noise, spikes, out of bound samples, nan samples,
+    a missing half hour and stuck at zero runs at start and end of day, within entity's filter bounds
+
+    Args:
+        day (dt.datetime): day (local midnight)
+        entity (str): entity tag of filterParamsDict
+        seed (int): random seed
+
+    Returns:
+        pd.core.frame.DataFrame: raw demand dataframe(epochMs, demandValue) like fetchRawDemandData
+    """
+    rng = np.random.default_rng(seed)
+    h1, h2, lowerBound, upperBound = filterParamsDict[entity]
+    dayStartMs = day.timestamp()*1000
+    numOfSamples = int(rng.integers(2000, 7000))
+    epochMs = np.sort(dayStartMs + rng.uniform(0, 24*60*60*1000, numOfSamples))
+    values = (lowerBound + upperBound)/2 + (upperBound - lowerBound)/6*np.sin(np.linspace(0, 6, numOfSamples)) + rng.normal(0, 80, numOfSamples)
+    isSpike = rng.random(numOfSamples) < 0.02
+    values[isSpike] += rng.choice([-1, 1], int(isSpike.sum()))*(h1 + 1500)
+    values[rng.random(numOfSamples) < 0.01] = upperBound*2
+    values[rng.random(numOfSamples) < 0.01] = np.nan
+    values[:40] = 0
+    values[-60:] = 0
+    isInGap = (epochMs > dayStartMs + 3e7) & (epochMs < dayStartMs + 3.18e7)
+    return pd.DataFrame({'epochMs': epochMs[~isInGap], 'demandValue': values[~isInGap]})
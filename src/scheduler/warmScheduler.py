@@ -0,0 +1,349 @@
+import csv
+import json
+import os
+import queue
+import threading
+import datetime as dt
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Set, Tuple
+from src.fetchers.scadaApiFetcher import ScadaApiFetcher
+from src.dayAheadForecastCreator.mlrPredictions import MlrPredictions
+from src.dayAheadForecastCreator.dayAheadForecastCreator import createDayAheadForecast, lagStartDict
+from src.filteredScadaDemandTodb.insFilteredScadaDemand import insFilteredScadaDemand
+from src.filteredScadaDemandTodb.intradayDemandIngest import IntradayDemandIngest
+from src.storage.storageBackendFactory import getStorageBackend
+
+runLogColumns = ['jobId', 'job', 'trigger', 'lane', 'attempt', 'isAfterFailedIngest', 'startDate', 'endDate',
+                 'requestedAt', 'startedAt', 'finishedAt', 'queueSecs', 'lockWaitSecs', 'runSecs', 'isSuccess']
+# table group each job writes, jobs writing same table group and day never run at the same time
+jobWriteTable = {'ingest': 'demand', 'forecast': 'forecast'}
+# scheduled jobs (and their retries and chained forecasts) never wait behind backfills
+lanes = ['schedule', 'backfill']
+
+
+def toTimeOfDay(value) -> dt.time:
+    """config time value ('HH:MM' string or excel time cell) to time of day"""
+    if isinstance(value, dt.datetime):
+        return value.time()
+    if isinstance(value, dt.time):
+        return value
+    return dt.datetime.strptime(str(value).strip()[:5], '%H:%M').time()
+
+
+class WarmScheduler():
+    """long running scheduler that keeps config, db pool, scada http sessions and models warm and runs
+    insFilteredScadaDemand and createDayAheadForecast jobs from two lanes, one for scheduled jobs and one for backfills.
+    daily ingest of yesterday is queued at 'daemon_ingest_time' (and once at startup if it was missed), a failed scheduled ingest is retried
+    'daemon_ingest_retries' times, forecast is queued as soon as ingest of its lag days is done (flagged if ingest failed),
+    backfills are queued through local http control interface on 'daemon_control_port' and today's filtered demand is polled every
+    'intraday_poll_secs'. every run is logged with its latency.
+    lanes run concurrently, but writes of overlapping days are serialized: an ingest job or intraday poll holds the demand table lock of all its days
+    and a forecast job holds the forecast table lock of all its days for the whole run, acquired all at once, so that two jobs never delete and
+    insert the same (time_stamp, entity_tag) rows at the same time. a job that overlaps a running one waits for it (lockWaitSecs in run log).
+    """
+
+    def __init__(self, configDict: dict) -> None:
+        """create warm resources once
+        Args:
+            configDict (dict): application configuration dictionary
+        """
+        warmUpStartTime = dt.datetime.now()
+        self.configDict = configDict
+        self.ingestTime = toTimeOfDay(configDict.get('daemon_ingest_time', '00:30'))
+        self.controlPort = int(configDict.get('daemon_control_port', 8085))
+        self.runLogPath = str(configDict.get('daemon_run_log_path', 'daemon_run_log.csv'))
+        self.numOfIngestRetries = int(configDict.get('daemon_ingest_retries', 3))
+        self.retryDelaySecs = float(configDict.get('daemon_retry_delay_secs', 600))
+        self.intradayPollSecs = float(configDict.get('intraday_poll_secs', 60))
+
+        self.storageBackend = getStorageBackend(configDict, usePool=True)
+        # fetcher and predictor per lane, their http session and prediction state are not shared between threads
+        self.scadaApiFetcherDict: Dict[str, ScadaApiFetcher] = {lane: self._createScadaApiFetcher() for lane in lanes}
+        self.mlrPredictionsDict: Dict[str, MlrPredictions] = {lane: self._createMlrPredictions() for lane in lanes}
+        self.obj_intradayDemandIngest = IntradayDemandIngest(self.storageBackend, self._createScadaApiFetcher())
+
+        self.jobQueueDict: Dict[str, queue.Queue] = {lane: queue.Queue() for lane in lanes}
+        self.currentJobDict: Dict[str, Optional[dict]] = {lane: None for lane in lanes}
+        self.pendingRetries: List[Tuple[dt.datetime, dict]] = []
+        self.runLog: deque = deque(maxlen=500)
+        self.lastIntradayPoll: Optional[dict] = None
+        self.nextIngestAt: Optional[dt.datetime] = None
+        self._jobIdCounter = 0
+        self._lock = threading.Lock()
+        self._heldDayKeys: Set[Tuple[str, dt.date]] = set()
+        self._dayLockCondition = threading.Condition()
+        self._stopEvent = threading.Event()
+        self._threads: List[threading.Thread] = []
+        self.controlServer: Optional[ThreadingHTTPServer] = None
+        self.warmUpSecs = (dt.datetime.now() - warmUpStartTime).total_seconds()
+        print('scheduler warm up done in {0:.1f}s'.format(self.warmUpSecs))
+
+    def _createScadaApiFetcher(self) -> ScadaApiFetcher:
+        return ScadaApiFetcher(self.configDict['tokenUrl'], self.configDict['apiBaseUrl'], self.configDict['clientId'], self.configDict['clientSecret'])
+
+    def _createMlrPredictions(self) -> MlrPredictions:
+        """predictor with calendar dummies and models of all entities loaded"""
+        obj_mlrPredictions = MlrPredictions(self.configDict['model_path'])
+        obj_mlrPredictions.getCalendarDummies()
+        for entity in lagStartDict:
+            try:
+                obj_mlrPredictions.loadModel(entity)
+            except Exception as err:
+                print('error while loading model of {0}'.format(entity), err)
+        return obj_mlrPredictions
+
+    def submitJob(self, job: str, startDate: dt.datetime, endDate: dt.datetime, trigger: str, chainForecast: bool = False,
+                  lane: Optional[str] = None, attempt: int = 1, isAfterFailedIngest: bool = False) -> dict:
+        """queue an ingest or forecast job
+        Args:
+            job (str): 'ingest' (insFilteredScadaDemand) or 'forecast' (createDayAheadForecast)
+            startDate (dt.datetime): start date
+            endDate (dt.datetime): end date
+            trigger (str): 'schedule', 'catchup', 'retry', 'backfill' or 'chain'
+            chainForecast (bool): queue forecast of days whose lag days are ingested, once ingest is done
+            lane (Optional[str]): 'schedule' or 'backfill', 'backfill' for backfill trigger and 'schedule' otherwise if not given
+            attempt (int): attempt number of scheduled ingest
+            isAfterFailedIngest (bool): forecast is queued although ingest of its lag days failed
+        Returns:
+            dict: queued job
+        """
+        if job not in ('ingest', 'forecast'):
+            raise ValueError("unknown job '{0}', expected 'ingest' or 'forecast'".format(job))
+        if endDate < startDate:
+            raise ValueError('end date is before start date')
+        if lane is None:
+            lane = 'backfill' if trigger == 'backfill' else 'schedule'
+        with self._lock:
+            self._jobIdCounter += 1
+            jobDict = {'jobId': self._jobIdCounter, 'job': job, 'trigger': trigger, 'lane': lane, 'attempt': attempt,
+                       'isAfterFailedIngest': isAfterFailedIngest, 'startDate': startDate, 'endDate': endDate,
+                       'chainForecast': chainForecast, 'requestedAt': dt.datetime.now()}
+        self.jobQueueDict[lane].put(jobDict)
+        return jobDict
+
+    @contextmanager
+    def _lockDays(self, table: str, startDate: dt.datetime, endDate: dt.datetime) -> Iterator[None]:
+        """hold write lock of table for all days from start to end date, waits until no other holder has any of these days.
+        all days are acquired at once, so holders never deadlock"""
+        dayKeys = {(table, (startDate + dt.timedelta(days=dayInd)).date()) for dayInd in range((endDate - startDate).days + 1)}
+        with self._dayLockCondition:
+            while len(dayKeys & self._heldDayKeys) > 0:
+                self._dayLockCondition.wait()
+            self._heldDayKeys |= dayKeys
+        try:
+            yield
+        finally:
+            with self._dayLockCondition:
+                self._heldDayKeys -= dayKeys
+                self._dayLockCondition.notify_all()
+
+    def _runJob(self, jobDict: dict) -> None:
+        """run a job with warm resources of its lane, log its latency, chain forecast and retry failed scheduled ingest"""
+        lane = jobDict['lane']
+        startedAt = dt.datetime.now()
+        runStartedAt = startedAt
+        self.currentJobDict[lane] = jobDict
+        isSuccess = False
+        try:
+            with self._lockDays(jobWriteTable[jobDict['job']], jobDict['startDate'], jobDict['endDate']):
+                runStartedAt = dt.datetime.now()
+                if jobDict['job'] == 'ingest':
+                    isSuccess = insFilteredScadaDemand(jobDict['startDate'], jobDict['endDate'], self.configDict,
+                                                       self.storageBackend, self.scadaApiFetcherDict[lane])
+                else:
+                    isSuccess = createDayAheadForecast(jobDict['startDate'], jobDict['endDate'], self.configDict,
+                                                       self.storageBackend, self.mlrPredictionsDict[lane])
+        except Exception as err:
+            print('error while running {0} job'.format(jobDict['job']), err)
+        finishedAt = dt.datetime.now()
+        self.currentJobDict[lane] = None
+
+        runRecord = {'jobId': jobDict['jobId'], 'job': jobDict['job'], 'trigger': jobDict['trigger'], 'lane': lane,
+                     'attempt': jobDict['attempt'], 'isAfterFailedIngest': jobDict['isAfterFailedIngest'],
+                     'startDate': dt.datetime.strftime(jobDict['startDate'], '%Y-%m-%d'), 'endDate': dt.datetime.strftime(jobDict['endDate'], '%Y-%m-%d'),
+                     'requestedAt': str(jobDict['requestedAt']), 'startedAt': str(startedAt), 'finishedAt': str(finishedAt),
+                     'queueSecs': (startedAt - jobDict['requestedAt']).total_seconds(), 'lockWaitSecs': (runStartedAt - startedAt).total_seconds(),
+                     'runSecs': (finishedAt - runStartedAt).total_seconds(),
+                     'isSuccess': bool(isSuccess)}
+        self.runLog.append(runRecord)
+        self._appendRunLogFile(runRecord)
+        print('{0} job {1} ({2} to {3}) {4} in {5:.1f}s'.format(runRecord['job'], runRecord['jobId'], runRecord['startDate'], runRecord['endDate'],
+                                                               'success' if isSuccess else 'failure', runRecord['runSecs']))
+        if jobDict['job'] != 'ingest':
+            return
+
+        isScheduledIngest = jobDict['trigger'] in ('schedule', 'catchup', 'retry')
+        if not isSuccess and isScheduledIngest and jobDict['attempt'] <= self.numOfIngestRetries:
+            retryAt = finishedAt + dt.timedelta(seconds=self.retryDelaySecs)
+            print('scheduled ingest failed, retry {0}/{1} at {2}'.format(jobDict['attempt'], self.numOfIngestRetries, retryAt))
+            with self._lock:
+                self.pendingRetries.append((retryAt, jobDict))
+        # forecast of day D uses demand up to D-1, so it can start as soon as ingest of D-1 is done.
+        # like run.bat, scheduled forecast runs even if first ingest attempt failed (with whatever demand is stored), a successful retry re-runs it
+        if jobDict['chainForecast'] and (isSuccess or (isScheduledIngest and jobDict['attempt'] == 1)):
+            if not isSuccess:
+                print('ingest failed, forecast of {0} to {1} is run with available demand'.format(
+                    dt.datetime.strftime(jobDict['startDate'] + dt.timedelta(days=1), '%Y-%m-%d'), dt.datetime.strftime(jobDict['endDate'] + dt.timedelta(days=1), '%Y-%m-%d')))
+            self.submitJob('forecast', jobDict['startDate'] + dt.timedelta(days=1), jobDict['endDate'] + dt.timedelta(days=1), 'chain',
+                           lane=lane, isAfterFailedIngest=not isSuccess)
+
+    def _appendRunLogFile(self, runRecord: dict) -> None:
+        try:
+            isNewFile = not os.path.exists(self.runLogPath)
+            with open(self.runLogPath, 'a', newline='') as runLogFile:
+                writer = csv.DictWriter(runLogFile, fieldnames=runLogColumns)
+                if isNewFile:
+                    writer.writeheader()
+                writer.writerow(runRecord)
+        except Exception as err:
+            print('error while writing run log', err)
+
+    def _isScheduledIngestDone(self, day: dt.datetime) -> bool:
+        """true if a scheduled (or catch up / retry) ingest of day succeeded, according to in memory and file run log"""
+        dayStr = dt.datetime.strftime(day, '%Y-%m-%d')
+        runRecords = list(self.runLog)
+        try:
+            if os.path.exists(self.runLogPath):
+                with open(self.runLogPath, newline='') as runLogFile:
+                    runRecords.extend(csv.DictReader(runLogFile))
+        except Exception as err:
+            print('error while reading run log', err)
+        return any(runRecord.get('job') == 'ingest' and runRecord.get('trigger') in ('schedule', 'catchup', 'retry') and
+                   runRecord.get('startDate') == dayStr and str(runRecord.get('isSuccess')) == 'True' for runRecord in runRecords)
+
+    def _workerLoop(self, lane: str) -> None:
+        jobQueue = self.jobQueueDict[lane]
+        while not self._stopEvent.is_set():
+            try:
+                jobDict = jobQueue.get(timeout=1)
+            except queue.Empty:
+                continue
+            self._runJob(jobDict)
+
+    def _computeNextIngestAt(self, now: dt.datetime) -> dt.datetime:
+        nextIngestAt = dt.datetime.combine(now.date(), self.ingestTime)
+        if nextIngestAt <= now:
+            nextIngestAt += dt.timedelta(days=1)
+        return nextIngestAt
+
+    def _scheduleLoop(self) -> None:
+        now = dt.datetime.now()
+        self.nextIngestAt = self._computeNextIngestAt(now)
+        # started after today's ingest time, run yesterday's scheduled ingest and forecast once if they were missed
+        yesterday = (now - dt.timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        if now.time() >= self.ingestTime and not self._isScheduledIngestDone(yesterday):
+            print('scheduled ingest of {0} was missed, running it now'.format(dt.datetime.strftime(yesterday, '%Y-%m-%d')))
+            self.submitJob('ingest', yesterday, yesterday, 'catchup', chainForecast=True)
+        while not self._stopEvent.is_set():
+            now = dt.datetime.now()
+            if now >= self.nextIngestAt:
+                # same default as index_insFilteredScadaDemand.py, yesterday's filtered demand
+                yesterday = (now - dt.timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
+                self.submitJob('ingest', yesterday, yesterday, 'schedule', chainForecast=True)
+                self.nextIngestAt = self._computeNextIngestAt(now)
+            with self._lock:
+                dueRetries = [jobDict for retryAt, jobDict in self.pendingRetries if retryAt <= now]
+                self.pendingRetries = [(retryAt, jobDict) for retryAt, jobDict in self.pendingRetries if retryAt > now]
+            for jobDict in dueRetries:
+                self.submitJob('ingest', jobDict['startDate'], jobDict['endDate'], 'retry', jobDict['chainForecast'], attempt=jobDict['attempt'] + 1)
+            self._stopEvent.wait(min(30.0, max((self.nextIngestAt - now).total_seconds(), 0.0)))
+
+    def _intradayLoop(self) -> None:
+        while not self._stopEvent.is_set():
+            pollStartTime = dt.datetime.now()
+            today = pollStartTime.replace(hour=0, minute=0, second=0, microsecond=0)
+            try:
+                # first poll of a day also writes previous day's last blocks
+                with self._lockDays('demand', today - dt.timedelta(days=1), today):
+                    numOfBlocks, isSuccess = self.obj_intradayDemandIngest.poll(pollStartTime)
+            except Exception as err:
+                print('error while intraday polling', err)
+                numOfBlocks, isSuccess = 0, False
+            self.lastIntradayPoll = {'polledAt': str(pollStartTime), 'numOfBlocks': numOfBlocks, 'isSuccess': isSuccess,
+                                     'pollSecs': (dt.datetime.now() - pollStartTime).total_seconds()}
+            self._stopEvent.wait(max(self.intradayPollSecs - self.lastIntradayPoll['pollSecs'], 0.0))
+
+    def _toJobStatus(self, jobDict: Optional[dict]) -> Optional[dict]:
+        if jobDict is None:
+            return None
+        return {'jobId': jobDict['jobId'], 'job': jobDict['job'], 'trigger': jobDict['trigger'],
+                'startDate': dt.datetime.strftime(jobDict['startDate'], '%Y-%m-%d'), 'endDate': dt.datetime.strftime(jobDict['endDate'], '%Y-%m-%d')}
+
+    def getStatus(self) -> dict:
+        """returns scheduler status for control interface"""
+        with self._lock:
+            pendingRetries = [{'retryAt': str(retryAt), 'attempt': jobDict['attempt'] + 1, 'startDate': dt.datetime.strftime(jobDict['startDate'], '%Y-%m-%d')}
+                              for retryAt, jobDict in self.pendingRetries]
+        return {'warmUpSecs': self.warmUpSecs,
+                'nextIngestAt': str(self.nextIngestAt) if self.nextIngestAt is not None else None,
+                'lanes': {lane: {'queueDepth': self.jobQueueDict[lane].qsize(), 'currentJob': self._toJobStatus(self.currentJobDict[lane])} for lane in lanes},
+                'pendingRetries': pendingRetries, 'lastIntradayPoll': self.lastIntradayPoll,
+                'storageTimings': self.storageBackend.getTimingSummaryDf().to_dict(orient='records')}
+
+    def start(self) -> None:
+        """start lane workers, schedule, intraday and control server threads"""
+        self._stopEvent.clear()
+        self.controlServer = ThreadingHTTPServer(('127.0.0.1', self.controlPort), makeControlRequestHandler(self))
+        self._threads = [threading.Thread(target=self._workerLoop, args=(lane,), name='scheduler-{0}-worker'.format(lane), daemon=True) for lane in lanes]
+        self._threads.append(threading.Thread(target=self._scheduleLoop, name='scheduler-schedule', daemon=True))
+        if self.intradayPollSecs > 0:
+            self._threads.append(threading.Thread(target=self._intradayLoop, name='scheduler-intraday', daemon=True))
+        self._threads.append(threading.Thread(target=self.controlServer.serve_forever, name='scheduler-control', daemon=True))
+        for thread in self._threads:
+            thread.start()
+        print('scheduler started, daily ingest at {0}, control interface on http://127.0.0.1:{1}'.format(self.ingestTime.strftime('%H:%M'), self.controlPort))
+
+    def stop(self) -> None:
+        """stop accepting requests, let running jobs finish and stop threads"""
+        self._stopEvent.set()
+        if self.controlServer is not None:
+            self.controlServer.shutdown()
+            self.controlServer.server_close()
+        for thread in self._threads:
+            thread.join()
+
+
+def makeControlRequestHandler(scheduler: WarmScheduler):
+    """http request handler class bound to scheduler.
+    GET /status, GET /runs, POST /backfill {"job": "ingest"|"forecast", "start_date": "yyyy-mm-dd", "end_date": "yyyy-mm-dd", "chain_forecast": bool}
+    """
+
+    class ControlRequestHandler(BaseHTTPRequestHandler):
+
+        def _sendJson(self, statusCode: int, body) -> None:
+            respBytes = json.dumps(body, default=str).encode('utf-8')
+            self.send_response(statusCode)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(respBytes)))
+            self.end_headers()
+            self.wfile.write(respBytes)
+
+        def do_GET(self) -> None:
+            if self.path == '/status':
+                self._sendJson(200, scheduler.getStatus())
+            elif self.path == '/runs':
+                self._sendJson(200, list(scheduler.runLog))
+            else:
+                self._sendJson(404, {'error': 'unknown path'})
+
+        def do_POST(self) -> None:
+            if self.path != '/backfill':
+                self._sendJson(404, {'error': 'unknown path'})
+                return
+            try:
+                reqBody = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))) or b'{}')
+                startDate = dt.datetime.strptime(reqBody['start_date'], '%Y-%m-%d')
+                endDate = dt.datetime.strptime(reqBody.get('end_date', reqBody['start_date']), '%Y-%m-%d')
+                jobDict = scheduler.submitJob(reqBody.get('job', 'ingest'), startDate, endDate, 'backfill', bool(reqBody.get('chain_forecast', False)))
+            except Exception as err:
+                self._sendJson(400, {'error': str(err)})
+                return
+            self._sendJson(202, {'jobId': jobDict['jobId'], 'queueDepth': scheduler.jobQueueDict[jobDict['lane']].qsize()})
+
+        def log_message(self, format, *args) -> None:
+            # request log is not needed, job runs are logged by scheduler
+            pass
+
+    return ControlRequestHandler
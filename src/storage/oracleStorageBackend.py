@@ -0,0 +1,156 @@
+import cx_Oracle
+import threading
+import datetime as dt
+from typing import List, Optional, Tuple
+import pandas as pd
+from src.storage.storageBackend import StorageBackend
+
+
+class OracleStorageBackend(StorageBackend):
+    """oracle (mis warehouse) implementation of storage backend.
+    """
+
+    backendName: str = 'oracle'
+
+    def __init__(self, con_string: str, poolSize: int = 0) -> None:
+        """initialize connection string
+        Args:
+            con_string ([type]): connection string
+            poolSize (int): max sessions of a session pool kept open across operations, new connection per operation if 0
+        """
+        super().__init__()
+        self.connString = con_string
+        self.poolSize = poolSize
+        self.sessionPool = None
+        self._poolLock = threading.Lock()
+
+    def _connect(self):
+        """returns a pooled session if pooling is enabled, else a new connection"""
+        if self.poolSize <= 0:
+            return cx_Oracle.connect(self.connString)
+        with self._poolLock:
+            if self.sessionPool is None:
+                # connection string is user/password@dsn
+                userPassword, dsn = self.connString.rsplit('@', 1)
+                user, password = userPassword.split('/', 1)
+                self.sessionPool = cx_Oracle.SessionPool(user, password, dsn, min=1, max=self.poolSize, increment=1, threaded=True)
+        return self.sessionPool.acquire()
+
+    def _release(self, connection) -> None:
+        """return session to pool or close connection"""
+        if self.sessionPool is not None:
+            self.sessionPool.release(connection)
+        else:
+            connection.close()
+
+    def _entityBinds(self, listOfEntity: List[str], params: dict) -> str:
+        """adds entity tags to bind params and returns bind placeholder string for IN clause"""
+        for ind, entity in enumerate(listOfEntity):
+            params['tag{0}'.format(ind)] = entity
+        return ','.join([':tag{0}'.format(ind) for ind in range(len(listOfEntity))])
+
+    def _fetchDf(self, fetch_sql: str, params: dict) -> pd.core.frame.DataFrame:
+        """run a single select and return result dataframe, empty dataframe on failure"""
+        resultDf = pd.DataFrame()
+        try:
+            connection = self._connect()
+        except Exception as err:
+            print('error while creating a connection', err)
+        else:
+            try:
+                cur = connection.cursor()
+                cur.execute("ALTER SESSION SET NLS_DATE_FORMAT = 'YYYY-MM-DD HH24:MI:SS' ")
+                resultDf = pd.read_sql(fetch_sql, params=params, con=connection)
+                cur.close()
+            except Exception as err:
+                print('error while fetching data', err)
+            finally:
+                self._release(connection)
+        return resultDf
+
+    def _executeManyInTransaction(self, statements: List[Tuple[str, List[Tuple]]]) -> bool:
+        """executemany each (sql, rows) in order and commit once, rollback all on failure"""
+        isInsertionSuccess = False
+        try:
+            connection = self._connect()
+        except Exception as err:
+            print('error while creating a connection', err)
+        else:
+            try:
+                cur = connection.cursor()
+                try:
+                    cur.execute("ALTER SESSION SET NLS_DATE_FORMAT = 'YYYY-MM-DD HH24:MI:SS' ")
+                    for sql, rows in statements:
+                        cur.executemany(sql, rows)
+                except Exception as e:
+                    print("error while insertion/deletion->", e)
+                    connection.rollback()
+                else:
+                    connection.commit()
+                    isInsertionSuccess = True
+                finally:
+                    cur.close()
+            except Exception as err:
+                print('error while creating a cursor', err)
+            finally:
+                self._release(connection)
+        return isInsertionSuccess
+
+    def fetchBlockwiseDemand(self, startTime: dt.datetime, endTime: dt.datetime, listOfEntity: List[str]) -> pd.core.frame.DataFrame:
+        params = {'start_time': startTime, 'end_time': endTime}
+        entityBinds = self._entityBinds(listOfEntity, params)
+        fetch_sql = "SELECT time_stamp, entity_tag, demand_value FROM interpolated_blockwise_demand WHERE time_stamp BETWEEN TO_DATE(:start_time) and TO_DATE(:end_time) and entity_tag IN ({0}) ORDER BY time_stamp".format(entityBinds)
+        with self.timedOperation('fetchBlockwiseDemand') as timingRecord:
+            demandDf = self._fetchDf(fetch_sql, params)
+            timingRecord['rows'] = len(demandDf)
+        demandDf.rename(columns={'TIME_STAMP': 'timestamp', 'ENTITY_TAG': 'entityTag', 'DEMAND_VALUE': 'demandValue'}, inplace=True)
+        return demandDf
+
+    def insertBlockwiseDemand(self, data: List[Tuple], qualityData: Optional[List[Tuple]] = None) -> bool:
+        # making list of tuple of timestamp(unique),entity_tag based on which deletion takes place before insertion of duplicate
+        existingRows = [(x[0],x[1]) for x in data]
+        statements = [("DELETE FROM interpolated_blockwise_demand WHERE time_stamp = :1 and entity_tag=:2", existingRows),
+                      ("INSERT INTO interpolated_blockwise_demand(time_stamp,ENTITY_TAG,demand_value) VALUES(:1, :2, :3)", data)]
+        if qualityData:
+            existingQualityRows = [(x[0],x[1]) for x in qualityData]
+            statements.append(("DELETE FROM blockwise_demand_quality WHERE time_stamp = :1 and entity_tag=:2", existingQualityRows))
+            statements.append(("INSERT INTO blockwise_demand_quality(time_stamp,ENTITY_TAG,sample_count,gap_minutes,hard_bound_rejections,hard_bound_minutes,spike_replacements) VALUES(:1, :2, :3, :4, :5, :6, :7)", qualityData))
+        with self.timedOperation('insertBlockwiseDemand', len(data)):
+            return self._executeManyInTransaction(statements)
+
+    def fetchDayAheadForecast(self, startTime: dt.datetime, endTime: dt.datetime, listOfEntity: List[str]) -> pd.core.frame.DataFrame:
+        params = {'start_time': startTime, 'end_time': endTime}
+        entityBinds = self._entityBinds(listOfEntity, params)
+        fetch_sql = "SELECT time_stamp, entity_tag, forecasted_demand_value FROM dfm2_dayahead_demand_forecast WHERE time_stamp BETWEEN TO_DATE(:start_time) and TO_DATE(:end_time) and entity_tag IN ({0}) ORDER BY time_stamp".format(entityBinds)
+        with self.timedOperation('fetchDayAheadForecast') as timingRecord:
+            forecastDf = self._fetchDf(fetch_sql, params)
+            timingRecord['rows'] = len(forecastDf)
+        forecastDf.rename(columns={'TIME_STAMP': 'timestamp', 'ENTITY_TAG': 'entityTag', 'FORECASTED_DEMAND_VALUE': 'forecastedDemand'}, inplace=True)
+        return forecastDf
+
+    def fetchForecastRevisions(self, startTime: dt.datetime, endTime: dt.datetime, listOfEntity: List[str], listOfRevision: Optional[List[str]] = None) -> pd.core.frame.DataFrame:
+        params = {'start_time': startTime, 'end_time': endTime}
+        entityBinds = self._entityBinds(listOfEntity, params)
+        fetch_sql = "SELECT time_stamp, entity_tag, revision_no, forecasted_demand_value FROM dfm2_forecast_revision_store WHERE time_stamp BETWEEN TO_DATE(:start_time) and TO_DATE(:end_time) and entity_tag IN ({0})".format(entityBinds)
+        if listOfRevision:
+            for ind, revisionNo in enumerate(listOfRevision):
+                params['rev{0}'.format(ind)] = revisionNo
+            fetch_sql += " and revision_no IN ({0})".format(','.join([':rev{0}'.format(ind) for ind in range(len(listOfRevision))]))
+        fetch_sql += " ORDER BY time_stamp"
+        with self.timedOperation('fetchForecastRevisions') as timingRecord:
+            forecastDf = self._fetchDf(fetch_sql, params)
+            timingRecord['rows'] = len(forecastDf)
+        forecastDf.rename(columns={'TIME_STAMP': 'timestamp', 'ENTITY_TAG': 'entityTag', 'REVISION_NO': 'revisionNo',
+                                   'FORECASTED_DEMAND_VALUE': 'forecastedDemand'}, inplace=True)
+        return forecastDf
+
+    def insertDayAheadForecast(self, forecastData: List[Tuple], revisionData: List[Tuple]) -> bool:
+        # making list of tuple of timestamp(unique),entityTag based on which deletion takes place before insertion of duplicate
+        existingForecastRows = [(x[0],x[1]) for x in forecastData]
+        existingRevisionRows = [(x[0],x[1],x[2]) for x in revisionData]
+        statements = [("DELETE FROM dfm2_dayahead_demand_forecast WHERE time_stamp = :1 and entity_tag=:2", existingForecastRows),
+                      ("INSERT INTO dfm2_dayahead_demand_forecast(time_stamp,ENTITY_TAG,forecasted_demand_value) VALUES(:1, :2, :3)", forecastData),
+                      ("DELETE FROM dfm2_forecast_revision_store WHERE time_stamp = :1 and entity_tag=:2 and revision_no=:3", existingRevisionRows),
+                      ("INSERT INTO dfm2_forecast_revision_store(time_stamp,ENTITY_TAG,revision_no, forecasted_demand_value) VALUES(:1, :2, :3, :4)", revisionData)]
+        with self.timedOperation('insertDayAheadForecast', len(forecastData)):
+            return self._executeManyInTransaction(statements)
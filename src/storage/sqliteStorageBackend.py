@@ -0,0 +1,135 @@
+import sqlite3
+import datetime as dt
+from typing import List, Optional, Tuple
+import pandas as pd
+from src.storage.storageBackend import StorageBackend
+
+#same tables and unique keys as sql/*.sql, timestamps stored as 'YYYY-MM-DD HH:MM:SS' text so that they sort and compare like oracle dates
+createTableSqls = ["""CREATE TABLE IF NOT EXISTS interpolated_blockwise_demand (
+                        id INTEGER PRIMARY KEY, time_stamp TEXT, entity_tag TEXT, demand_value REAL,
+                        UNIQUE(time_stamp, entity_tag))""",
+                   """CREATE TABLE IF NOT EXISTS blockwise_demand_quality (
+                        id INTEGER PRIMARY KEY, time_stamp TEXT, entity_tag TEXT, sample_count INTEGER, gap_minutes INTEGER,
+                        hard_bound_rejections INTEGER, hard_bound_minutes INTEGER, spike_replacements INTEGER,
+                        UNIQUE(time_stamp, entity_tag))""",
+                   """CREATE TABLE IF NOT EXISTS dfm2_dayahead_demand_forecast (
+                        id INTEGER PRIMARY KEY, time_stamp TEXT, entity_tag TEXT, forecasted_demand_value REAL,
+                        UNIQUE(time_stamp, entity_tag))""",
+                   """CREATE TABLE IF NOT EXISTS dfm2_forecast_revision_store (
+                        id INTEGER PRIMARY KEY, time_stamp TEXT, entity_tag TEXT, revision_no TEXT, forecasted_demand_value REAL,
+                        UNIQUE(time_stamp, entity_tag, revision_no))"""]
+
+
+class SqliteStorageBackend(StorageBackend):
+    """embedded sqlite implementation of storage backend, for local runs, dry runs, backfills and benchmarks without the warehouse.
+    """
+
+    backendName: str = 'sqlite'
+
+    def __init__(self, dbPath: str) -> None:
+        """initialize db file path and create tables if they do not exist
+        Args:
+            dbPath (str): sqlite db file path
+        """
+        super().__init__()
+        self.dbPath = dbPath
+        connection = self._connect()
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            for createTableSql in createTableSqls:
+                connection.execute(createTableSql)
+            connection.commit()
+        finally:
+            connection.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        """new connection per operation like oracle backend, so that backend can be shared across threads"""
+        connection = sqlite3.connect(self.dbPath, timeout=60)
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _toDbTime(self, timeObj: dt.datetime) -> str:
+        return dt.datetime.strftime(timeObj, '%Y-%m-%d %H:%M:%S')
+
+    def _fetchDf(self, fetch_sql: str, params: list) -> pd.core.frame.DataFrame:
+        """run a single select and return result dataframe with parsed timestamps, empty dataframe on failure"""
+        resultDf = pd.DataFrame()
+        try:
+            connection = self._connect()
+        except Exception as err:
+            print('error while creating a connection', err)
+        else:
+            try:
+                resultDf = pd.read_sql(fetch_sql, params=params, con=connection, parse_dates=['timestamp'])
+            except Exception as err:
+                print('error while fetching data', err)
+            finally:
+                connection.close()
+        return resultDf
+
+    def _executeManyInTransaction(self, statements: List[Tuple[str, List[Tuple]]]) -> bool:
+        """executemany each (sql, rows) in order and commit once, rollback all on failure"""
+        isInsertionSuccess = False
+        try:
+            connection = self._connect()
+        except Exception as err:
+            print('error while creating a connection', err)
+        else:
+            try:
+                for sql, rows in statements:
+                    connection.executemany(sql, rows)
+            except Exception as e:
+                print("error while insertion/deletion->", e)
+                connection.rollback()
+            else:
+                connection.commit()
+                isInsertionSuccess = True
+            finally:
+                connection.close()
+        return isInsertionSuccess
+
+    def _rangeAndEntityParams(self, startTime: dt.datetime, endTime: dt.datetime, listOfEntity: List[str]) -> Tuple[str, list]:
+        """where clause and params for time range and entity filter"""
+        whereSql = "time_stamp BETWEEN ? and ? and entity_tag IN ({0})".format(','.join(['?']*len(listOfEntity)))
+        return whereSql, [self._toDbTime(startTime), self._toDbTime(endTime)] + list(listOfEntity)
+
+    def fetchBlockwiseDemand(self, startTime: dt.datetime, endTime: dt.datetime, listOfEntity: List[str]) -> pd.core.frame.DataFrame:
+        whereSql, params = self._rangeAndEntityParams(startTime, endTime, listOfEntity)
+        fetch_sql = "SELECT time_stamp AS timestamp, entity_tag AS entityTag, demand_value AS demandValue FROM interpolated_blockwise_demand WHERE {0} ORDER BY time_stamp".format(whereSql)
+        with self.timedOperation('fetchBlockwiseDemand') as timingRecord:
+            demandDf = self._fetchDf(fetch_sql, params)
+            timingRecord['rows'] = len(demandDf)
+        return demandDf
+
+    def insertBlockwiseDemand(self, data: List[Tuple], qualityData: Optional[List[Tuple]] = None) -> bool:
+        # unique(time_stamp, entity_tag) makes INSERT OR REPLACE equivalent to delete + insert of oracle backend
+        statements = [("INSERT OR REPLACE INTO interpolated_blockwise_demand(time_stamp,entity_tag,demand_value) VALUES(?, ?, ?)", data)]
+        if qualityData:
+            statements.append(("INSERT OR REPLACE INTO blockwise_demand_quality(time_stamp,entity_tag,sample_count,gap_minutes,hard_bound_rejections,hard_bound_minutes,spike_replacements) VALUES(?, ?, ?, ?, ?, ?, ?)", qualityData))
+        with self.timedOperation('insertBlockwiseDemand', len(data)):
+            return self._executeManyInTransaction(statements)
+
+    def fetchDayAheadForecast(self, startTime: dt.datetime, endTime: dt.datetime, listOfEntity: List[str]) -> pd.core.frame.DataFrame:
+        whereSql, params = self._rangeAndEntityParams(startTime, endTime, listOfEntity)
+        fetch_sql = "SELECT time_stamp AS timestamp, entity_tag AS entityTag, forecasted_demand_value AS forecastedDemand FROM dfm2_dayahead_demand_forecast WHERE {0} ORDER BY time_stamp".format(whereSql)
+        with self.timedOperation('fetchDayAheadForecast') as timingRecord:
+            forecastDf = self._fetchDf(fetch_sql, params)
+            timingRecord['rows'] = len(forecastDf)
+        return forecastDf
+
+    def fetchForecastRevisions(self, startTime: dt.datetime, endTime: dt.datetime, listOfEntity: List[str], listOfRevision: Optional[List[str]] = None) -> pd.core.frame.DataFrame:
+        whereSql, params = self._rangeAndEntityParams(startTime, endTime, listOfEntity)
+        if listOfRevision:
+            whereSql += " and revision_no IN ({0})".format(','.join(['?']*len(listOfRevision)))
+            params += list(listOfRevision)
+        fetch_sql = "SELECT time_stamp AS timestamp, entity_tag AS entityTag, revision_no AS revisionNo, forecasted_demand_value AS forecastedDemand FROM dfm2_forecast_revision_store WHERE {0} ORDER BY time_stamp".format(whereSql)
+        with self.timedOperation('fetchForecastRevisions') as timingRecord:
+            forecastDf = self._fetchDf(fetch_sql, params)
+            timingRecord['rows'] = len(forecastDf)
+        return forecastDf
+
+    def insertDayAheadForecast(self, forecastData: List[Tuple], revisionData: List[Tuple]) -> bool:
+        statements = [("INSERT OR REPLACE INTO dfm2_dayahead_demand_forecast(time_stamp,entity_tag,forecasted_demand_value) VALUES(?, ?, ?)", forecastData),
+                      ("INSERT OR REPLACE INTO dfm2_forecast_revision_store(time_stamp,entity_tag,revision_no,forecasted_demand_value) VALUES(?, ?, ?, ?)", revisionData)]
+        with self.timedOperation('insertDayAheadForecast', len(forecastData)):
+            return self._executeManyInTransaction(statements)
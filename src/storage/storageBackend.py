@@ -0,0 +1,95 @@
+import time
+import datetime as dt
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+import pandas as pd
+
+
+class StorageBackend(ABC):
+    """storage interface for interpolated_blockwise_demand (with blockwise_demand_quality), dfm2_dayahead_demand_forecast
+    and dfm2_forecast_revision_store tables. every operation is timed so that backends can be compared.
+    """
+
+    backendName: str = ''
+
+    def __init__(self) -> None:
+        """initialize timing log"""
+        self.timingLog: List[dict] = []
+
+    @contextmanager
+    def timedOperation(self, operation: str, numOfRows: int = 0):
+        """context manager that appends wall time of operation to timing log, yields the timing record so that rows can be set after a fetch"""
+        timingRecord = {'backend': self.backendName, 'operation': operation, 'rows': numOfRows, 'secs': 0.0}
+        startTime = time.perf_counter()
+        try:
+            yield timingRecord
+        finally:
+            timingRecord['secs'] = time.perf_counter() - startTime
+            self.timingLog.append(timingRecord)
+
+    def getTimingSummaryDf(self) -> pd.core.frame.DataFrame:
+        """returns timing of each operation type
+        Returns:
+            pd.core.frame.DataFrame: dataframe(backend, operation, calls, rows, totalSecs, meanSecs)
+        """
+        if len(self.timingLog) == 0:
+            return pd.DataFrame(columns=['backend', 'operation', 'calls', 'rows', 'totalSecs', 'meanSecs'])
+        timingDf = pd.DataFrame(self.timingLog)
+        summaryDf = timingDf.groupby(['backend', 'operation']).agg(calls=('secs', 'size'), rows=('rows', 'sum'),
+                                                                     totalSecs=('secs', 'sum'), meanSecs=('secs', 'mean')).reset_index()
+        return summaryDf
+
+    @abstractmethod
+    def fetchBlockwiseDemand(self, startTime: dt.datetime, endTime: dt.datetime, listOfEntity: List[str]) -> pd.core.frame.DataFrame:
+        """fetch blockwise demand of entities between start and end time (both inclusive)
+        Args:
+            startTime (dt.datetime): start time
+            endTime (dt.datetime): end time
+            listOfEntity (List[str]): entity tags
+        Returns:
+            pd.core.frame.DataFrame: dataframe(timestamp, entityTag, demandValue) ordered by timestamp
+        """
+
+    @abstractmethod
+    def insertBlockwiseDemand(self, data: List[Tuple], qualityData: Optional[List[Tuple]] = None) -> bool:
+        """Insert block wise demand of entities, along with block wise data quality metrics if given. existing rows are replaced.
+        Args:
+            data (List[Tuple]): (timestamp, entity_tag, demand_value)
+            qualityData (Optional[List[Tuple]]): (timestamp, entity_tag, sample_count, gap_minutes, hard_bound_rejections, hard_bound_minutes, spike_replacements)
+        Returns:
+            bool: return true if insertion is successful else false
+        """
+
+    @abstractmethod
+    def fetchDayAheadForecast(self, startTime: dt.datetime, endTime: dt.datetime, listOfEntity: List[str]) -> pd.core.frame.DataFrame:
+        """fetch day ahead forecast of entities between start and end time (both inclusive)
+        Args:
+            startTime (dt.datetime): start time
+            endTime (dt.datetime): end time
+            listOfEntity (List[str]): entity tags
+        Returns:
+            pd.core.frame.DataFrame: dataframe(timestamp, entityTag, forecastedDemand) ordered by timestamp
+        """
+
+    @abstractmethod
+    def fetchForecastRevisions(self, startTime: dt.datetime, endTime: dt.datetime, listOfEntity: List[str], listOfRevision: Optional[List[str]] = None) -> pd.core.frame.DataFrame:
+        """fetch stored forecast revisions of entities between start and end time (both inclusive)
+        Args:
+            startTime (dt.datetime): start time
+            endTime (dt.datetime): end time
+            listOfEntity (List[str]): entity tags
+            listOfRevision (Optional[List[str]]): revision numbers like 'R0A', all revisions if None
+        Returns:
+            pd.core.frame.DataFrame: dataframe(timestamp, entityTag, revisionNo, forecastedDemand) ordered by timestamp
+        """
+
+    @abstractmethod
+    def insertDayAheadForecast(self, forecastData: List[Tuple], revisionData: List[Tuple]) -> bool:
+        """Insert day ahead forecast and its revision store rows in a single transaction. existing rows are replaced.
+        Args:
+            forecastData (List[Tuple]): (timestamp, entity_tag, forecasted_demand_value)
+            revisionData (List[Tuple]): (timestamp, entity_tag, revision_no, forecasted_demand_value)
+        Returns:
+            bool: return true if insertion is successful else false
+        """
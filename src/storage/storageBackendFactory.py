@@ -0,0 +1,21 @@
+from src.storage.storageBackend import StorageBackend
+
+
+def getStorageBackend(configDict: dict, usePool: bool = False) -> StorageBackend:
+    """create storage backend selected by 'storage_backend' config key ('oracle' by default, or 'sqlite')
+    Args:
+        configDict (dict): application configuration dictionary
+        usePool (bool): keep a db session pool ('db_pool_size' config key, default 4) open, for long running processes
+    Returns:
+        StorageBackend: storage backend object
+    """
+    backendName = str(configDict.get('storage_backend', 'oracle')).strip().lower()
+    # backends are imported lazily so that sqlite backend runs without cx_Oracle installed
+    if backendName == 'oracle':
+        from src.storage.oracleStorageBackend import OracleStorageBackend
+        poolSize = int(configDict.get('db_pool_size', 4)) if usePool else 0
+        return OracleStorageBackend(configDict['con_string_mis_warehouse'], poolSize)
+    if backendName == 'sqlite':
+        from src.storage.sqliteStorageBackend import SqliteStorageBackend
+        return SqliteStorageBackend(str(configDict.get('sqlite_db_path', 'dfm2_local.db')))
+    raise ValueError("unknown storage_backend '{0}', expected 'oracle' or 'sqlite'".format(backendName))